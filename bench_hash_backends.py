@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import numpy as np
+import randomhash
+from hll import hash_values
+
+
+DATASETS = "datasets"
+
+# Registers used to measure how evenly each backend spreads the words
+UNIFORMITY_P = 10
+
+
+# Distinct words of all the books of the datasets folder
+def load_words(folder_path=DATASETS):
+    words = set()
+    for filename in sorted(os.listdir(folder_path)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(folder_path, filename), "r", encoding="utf-8") as file:
+                words.update(file.read().split())
+    return sorted(words)
+
+
+# Chi-square statistic of the bucket counts, for the low and the high bits
+# of the hash values; close to the number of buckets minus one when uniform
+def uniformity(hashes, bits, p=UNIFORMITY_P):
+    m = 1 << p
+    expected = len(hashes) / m
+    low = np.bincount((hashes & np.uint64(m - 1)).astype(np.intp), minlength=m)
+    high = np.bincount((hashes >> np.uint64(bits - p)).astype(np.intp), minlength=m)
+    return ((low - expected) ** 2).sum() / expected, ((high - expected) ** 2).sum() / expected
+
+
+def benchmark_backend(name, words, repeat=3):
+    hash_family = randomhash.get_family(name, count=1, seed=1)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.time()
+        hashes = hash_values(hash_family, words)
+        best = min(best, time.time() - start_time)
+
+    chi_low, chi_high = uniformity(hashes, hash_family._WORD_SIZE)
+    collisions = len(words) - len(np.unique(hashes))
+    return len(words) / best, chi_low, chi_high, collisions
+
+
+def main():
+    words = load_words(sys.argv[1] if len(sys.argv) > 1 else DATASETS)
+    print("%d distinct words, chi-square over %d buckets (expected about %d)"
+          % (len(words), 1 << UNIFORMITY_P, (1 << UNIFORMITY_P) - 1))
+    print("%-8s %14s %12s %12s %11s" % ("backend", "keys/s", "chi2 low", "chi2 high", "collisions"))
+    for name in randomhash.BACKENDS:
+        print("%-8s %14.0f %12.1f %12.1f %11d" % ((name,) + benchmark_backend(name, words)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import time
+import numpy as np
+from hll import HyperLogLog, merge
+from randomhash import RandomHashFamily
+
+
+# Merge used by HyperLogLog.update before registers were stored in a buffer
+def update_lists(M, *others):
+    return [max(*items) for items in zip(*(list(others) + [M]))]
+
+
+# Build `n` dense sketches at precision `p` from random 32-bit hashes, the
+# width of the CRC32 family they share
+def build_sketches(p, n, items=2000):
+    error_rate = 1.04 / 2 ** (p / 2.0)
+    rng = np.random.default_rng(p)
+    hash_family = RandomHashFamily(count=1, seed=p)
+    sketches = []
+    for _ in range(n):
+        hll = HyperLogLog(error_rate=error_rate, hash_family=hash_family)
+        hll.add_hashes(rng.integers(0, 2 ** 32, size=items, dtype=np.uint64))
+        sketches.append(hll)
+    return sketches
+
+
+def benchmark_merge(p, n, workers=4):
+    sketches = build_sketches(p, n)
+    lists = [sketch._registers().tolist() for sketch in sketches]
+
+    start_time = time.time()
+    update_lists(lists[0], *lists[1:])
+    list_time = time.time() - start_time
+
+    start_time = time.time()
+    merged = merge(sketches)
+    buffer_time = time.time() - start_time
+
+    start_time = time.time()
+    parallel = merge(sketches, workers=workers)
+    parallel_time = time.time() - start_time
+
+    stacked = np.stack([sketch._registers() for sketch in sketches])
+    start_time = time.time()
+    target = sketches[0].copy()
+    target.update_registers(stacked)
+    stacked_time = time.time() - start_time
+
+    assert merged.card() == parallel.card() == target.card()
+    return list_time, buffer_time, parallel_time, stacked_time
+
+
+def main():
+    n = 1000  # Number of sketches merged at each precision
+    print("%3s %12s %12s %12s %12s" % ("p", "lists (s)", "in-place (s)", "threads (s)", "stacked (s)"))
+    for p in range(10, 17):
+        times = benchmark_merge(p, n)
+        print("%3d %12.4f %12.4f %12.4f %12.4f" % ((p,) + times))
+
+
+if __name__ == "__main__":
+    main()
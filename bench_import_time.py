@@ -0,0 +1,59 @@
+import os
+import sys
+import subprocess
+
+
+# Modules that must not be loaded by importing the estimators: reporting
+# dependencies, hash backends and tables that are only needed later
+LAZY_MODULES = ["pandas", "matplotlib", "tkinter", "xxhash", "hashlib", "const", "concurrent.futures"]
+
+# Import time budget of each module, in seconds (numpy alone takes most of it)
+BUDGETS = {
+    "randomhash": 0.05,
+    "serialization": 0.05,
+    "hll": 0.5,
+    "recordinality": 0.5,
+}
+
+CHILD = """
+import sys, time
+start_time = time.perf_counter()
+import %s
+print(time.perf_counter() - start_time)
+print(' '.join(name for name in %r if name in sys.modules))
+"""
+
+
+# Imports `module` in a fresh interpreter, returns the time taken and the
+# lazy modules it loaded
+def measure_import(module):
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python-random-hash-main", "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD % (module, LAZY_MODULES)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout.splitlines()
+
+    loaded = output[1].split() if len(output) > 1 else []
+    return float(output[0]), loaded
+
+
+def main(repeat=5):
+    failed = False
+    print("%-15s %10s %10s  %s" % ("module", "time (s)", "budget", "lazy modules loaded"))
+    for module, budget in BUDGETS.items():
+        results = [measure_import(module) for _ in range(repeat)]
+        best = min(elapsed for elapsed, _ in results)
+        loaded = sorted(set(name for _, names in results for name in names))
+        print("%-15s %10.4f %10.4f  %s" % (module, best, budget, " ".join(loaded) or "-"))
+        failed = failed or best > budget or bool(loaded)
+
+    if failed:
+        print("import time regression")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,23 @@
+import copy
 import math
-from randomhash import RandomHashFamily
+import bisect
+import itertools
+import numpy as np
+from randomhash import RandomHashFamily, get_family
+import serialization
+
+# the HLL++ tables of `const`, `concurrent.futures` and the joint estimator
+# of `hllsets` are only imported when first needed, to keep `import hll` fast
+
+
+# number of nearest raw estimates averaged by the HLL++ bias correction
+BIAS_NEIGHBORS = 6
+
+_bias_index = {}
+
+# 2^-k for every possible register value
+POW2_NEG = [2.0 ** -k for k in range(65)]
+POW2_NEG_ARRAY = np.array(POW2_NEG)
 
 
 def bit_length(w):
@@ -22,6 +40,105 @@ def get_alpha(p):
     return 0.7213 / (1.0 + 1.079 / (1 << p))
 
 
+def get_threshold(p):
+    """
+    Returns the HLL++ cardinality under which linear counting is preferred.
+    """
+    from const import tresholdData
+    return tresholdData[p - 4]
+
+
+def get_bias_index(p):
+    """
+    Returns the interpolation index over the HLL++ empirical tables for `p`.
+
+    The index is a pair `(raw, prefix)` where `raw` is the sorted list of raw
+    estimates and `prefix[i]` is the sum of the biases of the first `i` of
+    them, so that the mean bias of any window is computed in O(1). It is
+    built once per precision.
+    """
+    index = _bias_index.get(p)
+
+    if index is None:
+        if not (4 <= p <= 18):
+            raise ValueError("p=%d should be in range [4 : 18]" % p)
+
+        from const import rawEstimateData, biasData
+        pairs = sorted(zip(rawEstimateData[p - 4], biasData[p - 4]))
+
+        raw = [r for r, _ in pairs]
+        prefix = [0.0]
+        for _, b in pairs:
+            prefix.append(prefix[-1] + b)
+
+        index = _bias_index[p] = (raw, prefix)
+
+    return index
+
+
+def estimate_bias(E, p):
+    """
+    Estimates the bias of the raw estimate `E` at precision `p`, as the mean
+    bias of the `BIAS_NEIGHBORS` nearest raw estimates of the HLL++ tables.
+    """
+    raw, prefix = get_bias_index(p)
+
+    # the nearest neighbors of E form a window around its insertion point
+    lo = hi = bisect.bisect_left(raw, E)
+    for _ in range(min(BIAS_NEIGHBORS, len(raw))):
+        if lo > 0 and (hi == len(raw) or E - raw[lo - 1] <= raw[hi] - E):
+            lo -= 1
+        else:
+            hi += 1
+
+    return (prefix[hi] - prefix[lo]) / (hi - lo)
+
+
+def estimate_bias_array(E, p):
+    """
+    Vectorized `estimate_bias` for an array of raw estimates.
+    """
+    raw, prefix = get_bias_index(p)
+    raw = np.asarray(raw)
+    bias = np.diff(prefix)
+
+    E = np.asarray(E, dtype=np.float64)
+
+    # the nearest neighbors of each E are within BIAS_NEIGHBORS of its
+    # insertion point, keep the closest among those candidates
+    k = min(BIAS_NEIGHBORS, len(raw))
+    i = np.searchsorted(raw, E)[:, None] + np.arange(-k, k)
+    valid = (i >= 0) & (i < len(raw))
+    i = np.clip(i, 0, len(raw) - 1)
+
+    distance = np.where(valid, np.abs(raw[i] - E[:, None]), np.inf)
+    nearest = np.argsort(distance, axis=1, kind='stable')[:, :k]
+
+    return bias[np.take_along_axis(i, nearest, axis=1)].mean(axis=1)
+
+
+def estimate_cardinalities(zeros, hsum, p):
+    """
+    Array counterpart of `HyperLogLog.card`: estimates the cardinalities of
+    several sketches of precision `p` from their zero counts and harmonic sums.
+    """
+    m = 1 << p
+    zeros = np.asarray(zeros, dtype=np.float64)
+    hsum = np.asarray(hsum, dtype=np.float64)
+
+    E = get_alpha(p) * float(m ** 2) / hsum
+
+    biased = E <= 5 * m
+    if biased.any():
+        E[biased] -= estimate_bias_array(E[biased], p)
+
+    with np.errstate(divide='ignore'):
+        H = m * np.log(m / zeros)
+
+    linear = (zeros > 0) & (H <= get_threshold(p))
+    return np.where(linear, H, E)
+
+
 def get_rho(w, max_width):
     rho = max_width - bit_length(w) + 1
 
@@ -31,32 +148,312 @@ def get_rho(w, max_width):
     return rho
 
 
+def bit_length_array(w):
+    """
+    Vectorized `bit_length` for an array of unsigned 64-bit integers.
+    """
+    w = np.asarray(w, dtype=np.uint64)
+    _, bl = np.frexp(w.astype(np.float64))
+
+    # values above 2**53 may round up to the next power of two
+    # when converted to float, so correct the exponent if needed
+    bl = bl.astype(np.uint64)
+    over = (bl > 0) & ((w >> (np.maximum(bl, 1) - np.uint64(1))) == 0)
+    bl[over] -= np.uint64(1)
+
+    return bl
+
+
+def check_hash_bits(hashes, hash_bits):
+    """
+    Raises ValueError if a value of the uint64 array `hashes` is wider than
+    `hash_bits` bits, like `get_rho` for a single value.
+    """
+    if hash_bits < 64 and hashes.size and int(hashes.max()) >> hash_bits:
+        raise ValueError('w overflow')
+
+
+def index_and_rank(hashes, p, hash_bits):
+    """
+    Splits hash values into bucket indices (their `p` low bits) and ranks
+    (of their remaining `hash_bits - p` bits), like `HyperLogLog.add`.
+
+    :return: A pair of numpy arrays `(j, rho)`.
+    """
+    x = np.asarray(hashes, dtype=np.uint64)
+    check_hash_bits(x, hash_bits)
+
+    j = (x & np.uint64((1 << p) - 1)).astype(np.intp)
+    w = x >> np.uint64(p)
+    rho = (hash_bits - p + 1) - bit_length_array(w).astype(np.int64)
+
+    return j, rho
+
+
+def resolve_hash_family(hash_family, seed=None):
+    """
+    Returns the hash family to use for a `hash_family` argument: None gives the
+    default family, a name (see `randomhash.BACKENDS`) a family of that backend,
+    both with a single hash function and the given seed. A family is returned as is.
+    """
+    if hash_family is None:
+        return RandomHashFamily(count=1, seed=seed)
+    if isinstance(hash_family, str):
+        return get_family(hash_family, count=1, seed=seed)
+    return hash_family
+
+
+def hash_values(hash_family, values):
+    """
+    Hashes a chunk of values with the first function of `hash_family`.
+
+    :param hash_family: An instance of RandomHashFamily.
+    :param values: A sequence of values, converted to `str` if needed.
+    :return: A numpy array of uint64 hash values.
+    """
+    values = [v if isinstance(v, str) else str(v) for v in values]
+    return hash_family.hashes_batch(values, count=1)[:, 0].astype(np.uint64)
+
+
+def hash_chunks(hash_family, values, chunk_size):
+    """
+    Hashes an iterable of values chunk by chunk, see `hash_values`.
+
+    :param chunk_size: Number of values hashed at once.
+    :return: A generator of numpy arrays of at most `chunk_size` hash values.
+    """
+    values = iter(values)
+
+    while True:
+        chunk = list(itertools.islice(values, chunk_size))
+        if not chunk:
+            return
+        yield hash_values(hash_family, chunk)
+
+
+def packed_size(m):
+    """
+    Number of bytes needed to store `m` registers on 6 bits each.
+    """
+    return (6 * m + 7) >> 3
+
+
+def pack_registers(registers):
+    """
+    Packs uint8 registers (values below 64) on 6 bits each.
+
+    Groups of four registers are stored big-endian in three bytes.
+
+    :param registers: A numpy array of uint8 registers, of length a multiple of 4.
+    :return: A bytearray of `packed_size(len(registers))` bytes.
+    """
+    r = np.asarray(registers, dtype=np.uint8).reshape(-1, 4)
+
+    packed = np.empty((r.shape[0], 3), dtype=np.uint8)
+    packed[:, 0] = (r[:, 0] << 2) | (r[:, 1] >> 4)
+    packed[:, 1] = ((r[:, 1] & 0x0F) << 4) | (r[:, 2] >> 2)
+    packed[:, 2] = ((r[:, 2] & 0x03) << 6) | r[:, 3]
+
+    return bytearray(packed.tobytes())
+
+
+def unpack_registers(buf, m):
+    """
+    Unpacks `m` registers stored on 6 bits each by `pack_registers`.
+
+    :param buf: A bytes-like object holding the packed registers.
+    :param m: Number of registers.
+    :return: A numpy array of uint8 registers.
+    """
+    b = np.frombuffer(buf, dtype=np.uint8, count=packed_size(m)).reshape(-1, 3)
+
+    r = np.empty((b.shape[0], 4), dtype=np.uint8)
+    r[:, 0] = b[:, 0] >> 2
+    r[:, 1] = ((b[:, 0] & 0x03) << 4) | (b[:, 1] >> 4)
+    r[:, 2] = ((b[:, 1] & 0x0F) << 2) | (b[:, 2] >> 6)
+    r[:, 3] = b[:, 2] & 0x3F
+
+    return r.reshape(-1)
+
+
+def get_packed(buf, j):
+    """
+    Reads register `j` from a buffer produced by `pack_registers`.
+    """
+    bit = 6 * j
+    i, o = bit >> 3, bit & 7
+
+    if o <= 2:
+        return (buf[i] >> (2 - o)) & 0x3F
+
+    return ((buf[i] << 8 | buf[i + 1]) >> (10 - o)) & 0x3F
+
+
+def set_packed(buf, j, value):
+    """
+    Writes `value` to register `j` of a buffer produced by `pack_registers`.
+    """
+    bit = 6 * j
+    i, o = bit >> 3, bit & 7
+
+    if o <= 2:
+        shift = 2 - o
+        buf[i] = (buf[i] & ~(0x3F << shift) & 0xFF) | (value << shift)
+        return
+
+    shift = 10 - o
+    word = (buf[i] << 8 | buf[i + 1]) & ~(0x3F << shift) | (value << shift)
+    buf[i] = (word >> 8) & 0xFF
+    buf[i + 1] = word & 0xFF
+
+
+def merge_sparse(*encoded, dtype=np.uint32):
+    """
+    Merges arrays of sparse `(index << 6) | rank` pairs.
+
+    :param dtype: Type of the pairs, uint64 allows extra high bits in the index.
+    :return: A sorted array holding, for each index, the pair with the highest rank.
+    """
+    pairs = np.sort(np.concatenate(encoded).astype(dtype))
+    index = pairs >> 6
+
+    # pairs are sorted by index then rank, keep the last of each index
+    last = np.empty(len(pairs), dtype=bool)
+    last[:-1] = index[1:] != index[:-1]
+    last[-1:] = True
+
+    return pairs[last]
+
+
+def fold_registers(out, sketches):
+    """
+    Folds the registers of `sketches` into `out` with an in-place
+    elementwise maximum.
+
+    :param out: A uint8 numpy array of registers, updated in place.
+    :param sketches: An iterable of HyperLogLog counters or of register arrays.
+    :return: `out`.
+    """
+    for item in sketches:
+        if isinstance(item, np.ndarray):
+            np.maximum(out, item, out=out)
+        elif item.sparse:
+            j, rho = item.M >> 6, (item.M & 0x3F).astype(np.uint8)
+            out[j] = np.maximum(out[j], rho)
+        else:
+            np.maximum(out, item._registers(), out=out)
+
+    return out
+
+
+def reduce_registers(out, sketches, workers=None):
+    """
+    Folds the registers of `sketches` into `out`, optionally in parallel.
+
+    With `workers`, the sketches are split among threads that each fold
+    their share into a local accumulator (numpy releases the GIL), and the
+    partial results are then combined pairwise, as a reduction tree.
+
+    :param out: A uint8 numpy array of registers, updated in place.
+    :param sketches: A sequence of HyperLogLog counters, or a 2D array with one row of registers per sketch.
+    :param workers: Number of threads, or None to fold in the calling thread.
+    :return: `out`.
+    """
+    if not workers or workers < 2 or len(sketches) < 2 * workers:
+        if isinstance(sketches, np.ndarray) and sketches.ndim == 2 and len(sketches):
+            return np.maximum(out, sketches.max(axis=0), out=out)
+        return fold_registers(out, sketches)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    shares = [sketches[i::workers] for i in range(workers)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(
+            lambda share: reduce_registers(np.zeros_like(out), share), shares))
+
+        while len(partials) > 1:
+            pairs = list(zip(partials[0::2], partials[1::2]))
+            odd = partials[-1:] if len(partials) % 2 else []
+            partials = list(pool.map(lambda ab: np.maximum(ab[0], ab[1], out=ab[0]), pairs)) + odd
+
+    return np.maximum(out, partials[0], out=out)
+
+
+def merge(sketches, workers=None):
+    """
+    Returns a new HyperLogLog counting the union of `sketches`, which are
+    left unchanged.
+
+    :param sketches: A non-empty sequence of HyperLogLog counters.
+    :param workers: Number of threads used for large fan-in, see `reduce_registers`.
+    """
+    result = sketches[0].copy()
+    result.update(*sketches[1:], workers=workers)
+    return result
+
+
+def register_sums(M):
+    """
+    Returns the zero counts and harmonic sums of the register rows of `M`
+    (a uint8 array of shape (m,) or (n, m)).
+    """
+    M = np.asarray(M)
+    return M.shape[-1] - np.count_nonzero(M, axis=-1), POW2_NEG_ARRAY[M].sum(axis=-1)
+
+
 class HyperLogLog:
     """
     HyperLogLog cardinality counter using `randomhash`.
     """
 
-    def __init__(self, error_rate, hash_family=None):
+    def __init__(self, error_rate=None, hash_family=None, packed=False, sparse=False, p=None):
         """
         Initializes a HyperLogLog.
 
+        Registers are stored one per byte in a contiguous `bytearray`, or on
+        6 bits each when `packed` is set (see `pack` and `unpack`).
+
+        A sparse sketch only stores the touched registers, as a sorted uint32
+        array of `(index << 6) | rank` pairs, and is promoted to dense
+        registers once that array would take more memory than them.
+
         :param error_rate: Absolute error / cardinality.
-        :param hash_family: An instance of RandomHashFamily. If None, defaults to one with a single hash function.
+        :param hash_family: An instance of RandomHashFamily, or the name of a hash backend ('crc32', 'xxh32',
+            'xxh64', 'xxh3_64', 'blake2b'). If None, defaults to a CRC32 one with a single hash function.
+            Use a 64-bit family for large cardinalities, ranks are computed on the word size of the family.
+        :param packed: If True, store the registers in the 6-bit packed form.
+        :param sparse: If True, start with the sparse representation.
+        :param p: Precision, used instead of `error_rate` if given.
         """
-        if not (0 < error_rate < 1):
-            raise ValueError("Error_Rate must be between 0 and 1.")
+        if p is None:
+            if error_rate is None or not (0 < error_rate < 1):
+                raise ValueError("Error_Rate must be between 0 and 1.")
 
-        # Determine precision p and initialize registers
-        p = int(math.ceil(math.log((1.04 / error_rate) ** 2, 2)))
+            # Determine precision p and initialize registers
+            p = int(math.ceil(math.log((1.04 / error_rate) ** 2, 2)))
 
         self.alpha = get_alpha(p)
         self.p = p
         self.m = 1 << p
-        self.M = [0 for _ in range(self.m)]
+        self.packed = packed
+        self.sparse = sparse
+
+        if sparse:
+            self.M = np.empty(0, dtype=np.uint32)
+        else:
+            self.M = bytearray(packed_size(self.m) if packed else self.m)
 
         # Use provided hash family or create one
-        self.hash_family = hash_family or RandomHashFamily(count=1)
+        self.hash_family = resolve_hash_family(hash_family)
         self.hash_func = self.hash_family.hashes  # Default hash function from the family
+        self.hash_bits = self.hash_family._WORD_SIZE  # Width of the hash values
+
+        # Number of zero registers and harmonic sum, kept up to date by
+        # every change to the registers so that `card` is O(1)
+        self._zeros = self.m
+        self._hsum = float(self.m)
+        self._card = None
 
     def add(self, value):
         """
@@ -69,37 +466,352 @@ class HyperLogLog:
         x = self.hash_func(value)[0]  # Get the first hash value from the family
         j = x & (self.m - 1)  # Extract the first p bits
         w = x >> self.p  # Remaining bits
-        self.M[j] = max(self.M[j], get_rho(w, 64 - self.p))
+        rho = get_rho(w, self.hash_bits - self.p)
+
+        if self.sparse:
+            self._add_sparse(j, rho)
+        elif self.packed:
+            old = get_packed(self.M, j)
+            if rho > old:
+                set_packed(self.M, j, rho)
+                self._account(old, rho)
+        else:
+            old = self.M[j]
+            if rho > old:
+                self.M[j] = rho
+                self._account(old, rho)
+
+    def add_many(self, values, chunk_size=1 << 16):
+        """
+        Adds many items to the HyperLogLog.
+
+        Items are hashed chunk by chunk and applied with `add_hashes`.
 
-    def update(self, *others):
+        :param values: An iterable of items.
+        :param chunk_size: Number of items hashed at once.
+        """
+        for hashes in hash_chunks(self.hash_family, values, chunk_size):
+            self.add_hashes(hashes)
+
+    def add_hashes(self, hashes):
+        """
+        Adds an array of precomputed hash values to the HyperLogLog.
+
+        Bucket indices and ranks are derived with numpy bit operations,
+        and the registers are updated with a grouped maximum.
+
+        :param hashes: An array-like of unsigned hash values.
+        """
+        x = np.asarray(hashes, dtype=np.uint64)
+        if x.size == 0:
+            return
+
+        j, rho = index_and_rank(x, self.p, self.hash_bits)
+        pairs = (j.astype(np.uint32) << 6) | rho.astype(np.uint32)
+
+        if self.sparse:
+            self._merge_sparse(pairs)
+            return
+
+        # grouped maximum: one (index, rank) pair per touched register
+        pairs = merge_sparse(pairs)
+        self._raise(pairs >> 6, (pairs & 0x3F).astype(np.uint8))
+
+    def _raise(self, j, rho):
+        """
+        Internal function raising the registers at the distinct indices `j`
+        to at least `rho`, on dense storage.
+        """
+        M = self._registers()
+        old = M[j]
+        new = np.maximum(old, rho)
+        M[j] = new
+        self._store(M)
+
+        self._hsum += float(POW2_NEG_ARRAY[new].sum() - POW2_NEG_ARRAY[old].sum())
+        self._zeros -= int(np.count_nonzero(old == 0)) - int(np.count_nonzero(new == 0))
+        self._card = None
+
+    def _account(self, old, new):
+        """
+        Internal function recording that one register went from `old` to `new`.
+        """
+        self._hsum += POW2_NEG[new] - POW2_NEG[old]
+        if old == 0:
+            self._zeros -= 1
+        self._card = None
+
+    def _recount(self):
+        """
+        Internal function recomputing the zero count and the harmonic sum
+        from the registers, after a change to all of them.
+        """
+        if self.sparse:
+            self._zeros = self.m - len(self.M)
+            self._hsum = self._zeros + float(POW2_NEG_ARRAY[self.M & 0x3F].sum())
+        else:
+            M = self._registers()
+            self._zeros = self.m - int(np.count_nonzero(M))
+            self._hsum = float(POW2_NEG_ARRAY[M].sum())
+        self._card = None
+
+    def _add_sparse(self, j, rho):
+        """
+        Internal function updating one register of a sparse sketch.
+        """
+        i = int(np.searchsorted(self.M, j << 6))
+
+        if i < len(self.M) and int(self.M[i]) >> 6 == j:
+            old = int(self.M[i]) & 0x3F
+            if rho > old:
+                self.M[i] = (j << 6) | rho
+                self._account(old, rho)
+            return
+
+        self.M = np.insert(self.M, i, (j << 6) | rho)
+        self._account(0, rho)
+        self._check_sparse()
+
+    def _merge_sparse(self, *encoded):
+        """
+        Internal function merging sparse pairs into a sparse sketch.
+        """
+        self.M = merge_sparse(self.M, *encoded)
+        self._recount()
+        self._check_sparse()
+
+    def _check_sparse(self):
+        """
+        Internal function promoting the sketch to dense registers when the
+        sparse pairs take more memory than the dense registers would.
+        """
+        dense_size = packed_size(self.m) if self.packed else self.m
+
+        if self.M.nbytes > dense_size:
+            self._to_dense()
+
+    def _to_dense(self):
+        """
+        Internal function converting a sparse sketch to dense registers.
+        """
+        if self.sparse:
+            M = self._registers()
+            self.sparse = False
+            self.M = pack_registers(M) if self.packed else bytearray(M.tobytes())
+
+    def _registers(self):
+        """
+        Internal function returning the registers as a uint8 numpy array.
+
+        For dense storage this is a writable view on `M`, for packed
+        and sparse storage it is a copy.
+        """
+        if self.sparse:
+            M = np.zeros(self.m, dtype=np.uint8)
+            M[self.M >> 6] = self.M & 0x3F
+            return M
+
+        if self.packed:
+            return unpack_registers(self.M, self.m)
+
+        return np.frombuffer(self.M, dtype=np.uint8)
+
+    def _store(self, registers):
+        """
+        Internal function writing back registers obtained from `_registers`.
+
+        Dense registers are a view on `M`, so only the packed form needs it.
+        """
+        if self.packed:
+            self.M[:] = pack_registers(registers)
+
+    def pack(self):
+        """
+        Switches the registers to the 6-bit packed form (for cold sketches).
+        """
+        if not self.packed and not self.sparse:
+            self.M = pack_registers(self._registers())
+        self.packed = True
+
+    def unpack(self):
+        """
+        Switches the registers back to one byte per register.
+        """
+        if self.packed and not self.sparse:
+            self.M = bytearray(self._registers().tobytes())
+        self.packed = False
+
+    def copy(self):
+        """
+        Returns a copy of this HyperLogLog, sharing its hash family.
+        """
+        other = copy.copy(self)
+        other.M = self.M.copy() if self.sparse else bytearray(self.M)
+        return other
+
+    def to_bytes(self):
+        """
+        Serializes this HyperLogLog, see `serialization` for the format.
+
+        The body holds the registers in their current form: dense, 6-bit
+        packed or sparse pairs.
+        """
+        if self.sparse:
+            encoding, body = serialization.SPARSE, self.M.astype('<u4')
+        else:
+            encoding = serialization.PACKED if self.packed else serialization.DENSE
+            body = self.M
+
+        header = serialization.pack_header(
+            serialization.HYPERLOGLOG, encoding, self.p, self.hash_family, len(body))
+
+        return header + bytes(body)
+
+    @classmethod
+    def from_bytes(cls, data, hash_family=None, copy=True):
+        """
+        Deserializes a HyperLogLog produced by `to_bytes`.
+
+        :param data: A bytes-like object.
+        :param hash_family: The hash family to use, or the name of its backend, which should
+            match the one recorded in `data`. If None, it is rebuilt from the recorded family id and seed.
+        :param copy: If False, dense and packed registers are a memoryview on
+            `data` instead of a copy (they are read-only if `data` is).
+        """
+        encoding, p, family_id, word_size, seed, count, length, body = \
+            serialization.unpack_header(data, serialization.HYPERLOGLOG)
+
+        hash_family = serialization.header_family(hash_family, family_id, word_size, seed, count)
+
+        hll = cls(p=p, hash_family=hash_family,
+                  packed=encoding == serialization.PACKED,
+                  sparse=encoding == serialization.SPARSE)
+
+        if encoding == serialization.SPARSE:
+            hll.M = np.frombuffer(body, dtype='<u4', count=length).astype(np.uint32)
+        else:
+            if length != len(hll.M):
+                raise ValueError('register count does not match precision')
+            hll.M = bytearray(body[:length]) if copy else body[:length]
+
+        hll._recount()
+        return hll
+
+    def update(self, *others, workers=None):
         """
         Merges other HyperLogLog counters into this one.
+
+        The registers are merged in place with an elementwise maximum.
+
+        :param others: HyperLogLog counters with the same precision and hash family.
+        :param workers: Number of threads used for large fan-in, see `reduce_registers`.
         """
         for item in others:
             if self.m != item.m:
                 raise ValueError('Counters precisions should be equal')
+            serialization.check_hash_family(self.hash_family, item.hash_family)
+
+        if self.sparse and all(item.sparse for item in others):
+            self._merge_sparse(*(item.M for item in others))
+            return
+
+        self._to_dense()
+
+        M = self._registers()
+        reduce_registers(M, others, workers)
+        self._store(M)
+        self._recount()
+
+    def update_registers(self, registers, workers=None):
+        """
+        Merges stacked dense registers into this HyperLogLog.
 
-        self.M = [max(*items) for items in zip(*([item.M for item in others] + [self.M]))]
+        :param registers: A uint8 array of shape (m,) or (n, m), one row of registers per sketch.
+        :param workers: Number of threads used for large fan-in, see `reduce_registers`.
+        """
+        registers = np.asarray(registers, dtype=np.uint8).reshape(-1, self.m)
+
+        self._to_dense()
+
+        M = self._registers()
+        reduce_registers(M, registers, workers)
+        self._store(M)
+        self._recount()
+
+    def union_card(self, *others):
+        """
+        Returns the estimated cardinality of the union of this HyperLogLog
+        and `others`, without modifying any of them.
+        """
+        for item in others:
+            if self.m != item.m:
+                raise ValueError('Counters precisions should be equal')
+            serialization.check_hash_family(self.hash_family, item.hash_family)
+
+        M = np.array(self._registers())
+        fold_registers(M, others)
+        zeros, hsum = register_sums(M)
+        return float(estimate_cardinalities([zeros], [hsum], self.p)[0])
+
+    def intersection_card(self, other, method='mle'):
+        """
+        Returns the estimated cardinality of the intersection of this
+        HyperLogLog and `other`.
+
+        :param method: 'mle' for the maximum-likelihood joint estimator, or
+            'inclusion_exclusion' for |A| + |B| - |A u B|.
+        """
+        if method == 'mle':
+            from hllsets import joint_estimate
+            return joint_estimate(self, other)[2]
+        if method == 'inclusion_exclusion':
+            return max(self.card() + other.card() - self.union_card(other), 0.0)
+        raise ValueError("unknown method %r" % method)
+
+    def jaccard(self, other, method='mle'):
+        """
+        Returns the estimated Jaccard similarity of this HyperLogLog and
+        `other`, see `intersection_card` for `method`.
+        """
+        if method == 'mle':
+            from hllsets import joint_estimate
+            only_self, only_other, both = joint_estimate(self, other)
+            union = only_self + only_other + both
+            return both / union if union > 0 else 0.0
+
+        union = self.union_card(other)
+        return self.intersection_card(other, method) / union if union > 0 else 0.0
 
     def __len__(self):
         return round(self.card())
 
     def _Ep(self):
         """
-        Internal function to calculate the estimate.
+        Internal function to calculate the estimate, with the HLL++ bias
+        correction applied below 5m.
         """
-        E = self.alpha * float(self.m ** 2) / sum(math.pow(2.0, -x) for x in self.M)
-        return E  # Removed bias correction for simplicity unless provided
+        E = self.alpha * float(self.m ** 2) / self._hsum
+
+        if E <= 5 * self.m:
+            E -= estimate_bias(E, self.p)
+
+        return E
 
     def card(self):
         """
         Returns the estimate of the cardinality.
+
+        The estimate is computed from the maintained zero count and harmonic
+        sum, and cached until the registers change.
         """
-        V = self.M.count(0)
+        if self._card is None:
+            V = self._zeros
 
-        if V > 0:
-            H = self.m * math.log(self.m / float(V))
-            return H if H <= 5 * self.m else self._Ep()
-        else:
-            return self._Ep()
+            if V > 0:
+                H = self.m * math.log(self.m / float(V))
+                self._card = H if H <= get_threshold(self.p) else self._Ep()
+            else:
+                self._card = self._Ep()
+
+        return self._card
 
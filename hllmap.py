@@ -0,0 +1,304 @@
+import numpy as np
+from hll import (
+    HyperLogLog,
+    POW2_NEG_ARRAY,
+    estimate_cardinalities,
+    hash_values,
+    index_and_rank,
+    merge_sparse,
+)
+
+
+# number of dense rows whose sums are computed at once by `_Shard.sums`
+SUMS_BLOCK = 1024
+
+
+class _Shard:
+    """
+    Registers of a contiguous range of groups of a HyperLogLogMap.
+
+    Sparse groups share one sorted uint64 array of
+    `(group << 32) | (index << 6) | rank` pairs, dense groups each own a row
+    of a uint8 register matrix.
+    """
+
+    def __init__(self, owner, size):
+        self.owner = owner
+        self.m = owner.m
+        self.pairs = np.empty(0, dtype=np.uint64)
+        self.rows = np.full(size, -1, dtype=np.int32)  # dense row of each group, -1 if sparse
+        self.dense = np.zeros((0, self.m), dtype=np.uint8)
+        self.n_dense = 0
+
+    @property
+    def nbytes(self):
+        return self.pairs.nbytes + self.rows.nbytes + self.dense.nbytes
+
+    def add(self, g, j, rho):
+        """
+        Raises the registers `j` of the groups `g` (local ids) to at least `rho`.
+        """
+        rows = self.rows[g]
+        dense = rows >= 0
+
+        if dense.any():
+            np.maximum.at(self.dense, (rows[dense], j[dense]), rho[dense].astype(np.uint8))
+
+        sparse = ~dense
+        if sparse.any():
+            encoded = (
+                (g[sparse].astype(np.uint64) << np.uint64(32))
+                | (j[sparse].astype(np.uint64) << np.uint64(6))
+                | rho[sparse].astype(np.uint64)
+            )
+            self.pairs = merge_sparse(self.pairs, encoded, dtype=np.uint64)
+            self._promote()
+
+    def _promote(self):
+        """
+        Moves the groups whose sparse pairs take more memory than a dense row
+        to the register matrix.
+        """
+        g = (self.pairs >> np.uint64(32)).astype(np.intp)
+        counts = np.bincount(g, minlength=len(self.rows))
+
+        promoted = np.nonzero(8 * counts > self.m)[0]
+        if not len(promoted):
+            return
+
+        needed = self.n_dense + len(promoted)
+        if needed > len(self.dense):
+            # a promoted row takes less memory than the pairs it replaces, so
+            # growing to `needed` rows always fits the budget, doubling may not
+            freed = 8 * int(counts[promoted].sum())
+            capacity = max(needed, 2 * len(self.dense))
+            if not self.owner._fits((capacity - len(self.dense)) * self.m - freed):
+                capacity = needed
+            dense = np.zeros((capacity, self.m), dtype=np.uint8)
+            dense[:self.n_dense] = self.dense[:self.n_dense]
+            self.dense = dense
+
+        self.rows[promoted] = np.arange(self.n_dense, needed)
+        self.n_dense = needed
+
+        moved = self.rows[g] >= 0
+        pairs = self.pairs[moved]
+        self.dense[self.rows[g[moved]], (pairs >> np.uint64(6) & np.uint64(self.m - 1)).astype(np.intp)] = \
+            (pairs & np.uint64(0x3F)).astype(np.uint8)
+        self.pairs = self.pairs[~moved]
+
+    def sketch(self, g):
+        """
+        Returns a HyperLogLog holding a copy of the registers of group `g` (local id).
+        """
+        owner = self.owner
+        row = self.rows[g]
+
+        if row >= 0:
+            hll = HyperLogLog(p=owner.p, hash_family=owner.hash_family)
+            hll.M = bytearray(self.dense[row].tobytes())
+        else:
+            lo, hi = np.searchsorted(self.pairs >> np.uint64(32), [g, g + 1])
+            hll = HyperLogLog(p=owner.p, hash_family=owner.hash_family, sparse=True)
+            hll.M = (self.pairs[lo:hi] & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+        hll._recount()
+        return hll
+
+    def sums(self, count):
+        """
+        Returns the zero counts and harmonic sums of the first `count` groups.
+        """
+        m = self.m
+        zeros = np.full(count, m, dtype=np.int64)
+        hsum = np.full(count, float(m))
+
+        # each touched register contributes 2^-rank instead of 1
+        g = (self.pairs >> np.uint64(32)).astype(np.intp)
+        rho = (self.pairs & np.uint64(0x3F)).astype(np.intp)
+        zeros -= np.bincount(g, minlength=count)[:count]
+        hsum += np.bincount(g, weights=POW2_NEG_ARRAY[rho] - 1.0, minlength=count)[:count]
+
+        groups = np.nonzero(self.rows[:count] >= 0)[0]
+        for start in range(0, len(groups), SUMS_BLOCK):
+            block = groups[start:start + SUMS_BLOCK]
+            registers = self.dense[self.rows[block]]
+            zeros[block] = m - np.count_nonzero(registers, axis=1)
+            hsum[block] = POW2_NEG_ARRAY[registers].sum(axis=1)
+
+        return zeros, hsum
+
+
+class HyperLogLogMap:
+    """
+    Distinct counting per group: one HyperLogLog per group key, all sharing
+    one hash family.
+
+    Groups are numbered in order of appearance and split into shards of
+    `shard_size` consecutive groups. Every group starts sparse and is moved
+    to a dense register row of its shard once that takes less memory.
+    """
+
+    def __init__(self, error_rate=None, hash_family=None, p=None, shard_size=1 << 16, memory_budget=None):
+        """
+        Initializes an empty HyperLogLogMap.
+
+        :param error_rate: Absolute error / cardinality, of each group.
+        :param hash_family: An instance of RandomHashFamily, or the name of a hash backend, shared by all groups.
+        :param p: Precision, used instead of `error_rate` if given.
+        :param shard_size: Number of groups per shard.
+        :param memory_budget: Maximum number of bytes of registers, or None.
+            A batch that would exceed it raises MemoryError.
+        """
+        prototype = HyperLogLog(error_rate=error_rate, hash_family=hash_family, p=p)
+
+        self.p = prototype.p
+        self.m = prototype.m
+        self.hash_family = prototype.hash_family
+        self.hash_bits = prototype.hash_bits
+
+        self.shard_size = shard_size
+        self.memory_budget = memory_budget
+
+        self.groups = {}  # group key -> group id
+        self.shards = []
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes used by the registers of all groups.
+        """
+        return sum(shard.nbytes for shard in self.shards)
+
+    def _fits(self, nbytes):
+        """
+        Internal function returning whether `nbytes` more bytes fit in the budget.
+        """
+        return self.memory_budget is None or self.nbytes + nbytes <= self.memory_budget
+
+    def _reserve(self, nbytes):
+        """
+        Internal function checking that `nbytes` more bytes fit in the budget.
+        """
+        if not self._fits(nbytes):
+            raise MemoryError('HyperLogLogMap memory budget of %d bytes exceeded' % self.memory_budget)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __contains__(self, key):
+        return key in self.groups
+
+    def keys(self):
+        """
+        Returns the group keys, in group id order.
+        """
+        return list(self.groups)
+
+    def _group_ids(self, keys):
+        """
+        Internal function returning the ids of `keys`, and the ids to assign
+        to the new ones, as a dict. The new keys are not registered.
+        """
+        groups = self.groups
+        new = {key: len(groups) + i for i, key in enumerate(key for key in dict.fromkeys(keys) if key not in groups)}
+
+        get = groups.get
+        ids = np.fromiter((get(key, new.get(key)) for key in keys), dtype=np.int64, count=len(keys))
+
+        return ids, new
+
+    def add(self, key, value):
+        """
+        Adds one item to the group `key`.
+        """
+        self.add_pairs([key], [value])
+
+    def add_pairs(self, keys, values):
+        """
+        Adds a batch of items, `values[i]` going to the group `keys[i]`.
+
+        :param keys: A sequence of group keys.
+        :param values: A sequence of items, of the same length.
+        """
+        self.add_hashes(keys, hash_values(self.hash_family, values))
+
+    def add_hashes(self, keys, hashes):
+        """
+        Adds a batch of precomputed hash values, `hashes[i]` going to the group `keys[i]`.
+        """
+        if len(keys) != len(hashes):
+            raise ValueError('keys and values should have the same length')
+        if not len(keys):
+            return
+
+        ids, new = self._group_ids(keys)
+        j, rho = index_and_rank(hashes, self.p, self.hash_bits)
+
+        n_shards = -(-(len(self.groups) + len(new)) // self.shard_size)
+        shard_ids = ids // self.shard_size
+        order = np.argsort(shard_ids, kind='stable')
+        bounds = np.searchsorted(shard_ids[order], np.arange(n_shards + 1))
+
+        # check the budget before changing anything: the new shards, and a
+        # pair for each item of a sparse group (promotions never add memory)
+        sparse = bounds[-1] - bounds[len(self.shards)]
+        for s, shard in enumerate(self.shards):
+            part = order[bounds[s]:bounds[s + 1]]
+            sparse += int(np.count_nonzero(shard.rows[ids[part] - s * self.shard_size] < 0))
+
+        self._reserve(4 * self.shard_size * (n_shards - len(self.shards)) + 8 * sparse)
+
+        self.groups.update(new)
+        while len(self.shards) < n_shards:
+            self.shards.append(_Shard(self, self.shard_size))
+
+        for s, shard in enumerate(self.shards):
+            part = order[bounds[s]:bounds[s + 1]]
+            if len(part):
+                shard.add(ids[part] - s * self.shard_size, j[part], rho[part])
+
+    def sketch(self, key):
+        """
+        Returns a HyperLogLog holding a copy of the registers of group `key`,
+        which does not follow later additions to the group.
+        """
+        gid = self.groups[key]
+        return self.shards[gid // self.shard_size].sketch(gid % self.shard_size)
+
+    def card(self, key):
+        """
+        Returns the estimated number of distinct items of group `key`.
+        """
+        return self.sketch(key).card()
+
+    def cards(self):
+        """
+        Returns the estimated cardinalities of all groups, in `keys` order.
+        """
+        n = len(self.groups)
+        zeros = np.empty(n, dtype=np.int64)
+        hsum = np.empty(n)
+
+        for s, shard in enumerate(self.shards):
+            start = s * self.shard_size
+            count = min(self.shard_size, n - start)
+            zeros[start:start + count], hsum[start:start + count] = shard.sums(count)
+
+        return estimate_cardinalities(zeros, hsum, self.p)
+
+    def top(self, n):
+        """
+        Returns the `n` groups with the highest estimated cardinalities, as
+        a list of `(key, estimate)` pairs in decreasing order.
+        """
+        estimates = self.cards()
+        n = min(n, len(estimates))
+        if n <= 0:
+            return []
+
+        best = np.argpartition(-estimates, n - 1)[:n]
+        best = best[np.argsort(-estimates[best], kind='stable')]
+
+        keys = self.keys()
+        return [(keys[i], float(estimates[i])) for i in best]
@@ -0,0 +1,271 @@
+from collections import OrderedDict
+import numpy as np
+import serialization
+from hll import estimate_cardinalities, register_sums
+
+
+def nelder_mead(f, x0, step=1.0, tol=1e-9, max_iter=1000):
+    """
+    Minimizes `f` from `x0` with the Nelder-Mead simplex method.
+
+    :return: The best point found, as a numpy array.
+    """
+    n = len(x0)
+    simplex = [np.asarray(x0, dtype=np.float64)]
+    for i in range(n):
+        x = simplex[0].copy()
+        x[i] += step
+        simplex.append(x)
+    values = [f(x) for x in simplex]
+
+    for _ in range(max_iter):
+        order = np.argsort(values)
+        simplex = [simplex[i] for i in order]
+        values = [values[i] for i in order]
+
+        if abs(values[-1] - values[0]) <= tol * (abs(values[0]) + tol):
+            break
+
+        centroid = np.mean(simplex[:-1], axis=0)
+        reflected = centroid + (centroid - simplex[-1])
+        fr = f(reflected)
+
+        if fr < values[0]:
+            expanded = centroid + 2.0 * (centroid - simplex[-1])
+            fe = f(expanded)
+            simplex[-1], values[-1] = (expanded, fe) if fe < fr else (reflected, fr)
+        elif fr < values[-2]:
+            simplex[-1], values[-1] = reflected, fr
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+            fc = f(contracted)
+            if fc < values[-1]:
+                simplex[-1], values[-1] = contracted, fc
+            else:
+                # shrink towards the best point
+                simplex = [simplex[0]] + [simplex[0] + 0.5 * (x - simplex[0]) for x in simplex[1:]]
+                values = [values[0]] + [f(x) for x in simplex[1:]]
+
+    return simplex[int(np.argmin(values))]
+
+
+def joint_log_likelihood(counts, lam_a, lam_b, lam_x, m, q):
+    """
+    Log-likelihood of two sketches, given the Poisson rates of the items
+    only in the first (`lam_a`), only in the second (`lam_b`) and in both
+    (`lam_x`).
+
+    :param counts: A (q + 2, q + 2) array, `counts[k1, k2]` being the number of
+        registers equal to `k1` in the first sketch and to `k2` in the second.
+    :param m: Number of registers.
+    :param q: Number of bits used for the ranks, ranks go up to q + 1.
+    """
+    # register value CDFs, P(K <= k) for k = -1 .. q + 1
+    k = np.arange(-1, q + 2)
+    exponent = np.ldexp(1.0, -np.clip(k, 0, q)) / m
+
+    def cdf(lam):
+        return np.where(k < 0, 0.0, np.where(k > q, 1.0, np.exp(-lam * exponent)))
+
+    # G[a, b] = P(K1 <= a - 1, K2 <= b - 1), where K1 = max(Ka, Kx) and K2 = max(Kb, Kx)
+    Fx = cdf(lam_x)
+    G = cdf(lam_a)[:, None] * cdf(lam_b)[None, :] * Fx[np.minimum.outer(np.arange(q + 3), np.arange(q + 3))]
+    P = G[1:, 1:] - G[:-1, 1:] - G[1:, :-1] + G[:-1, :-1]
+
+    observed = counts > 0
+    return float((counts[observed] * np.log(np.maximum(P[observed], 1e-300))).sum())
+
+
+def joint_estimate_registers(M1, M2, p, hash_bits):
+    """
+    Maximum-likelihood joint estimate of the cardinalities of two register
+    arrays of precision `p`, filled from hashes of `hash_bits` bits.
+
+    :return: A tuple `(only_first, only_second, both)` of estimated cardinalities.
+    """
+    m, q = 1 << p, hash_bits - p
+    M1 = np.asarray(M1, dtype=np.intp)
+    M2 = np.asarray(M2, dtype=np.intp)
+    counts = np.bincount(M1 * (q + 2) + M2, minlength=(q + 2) ** 2).reshape(q + 2, q + 2)
+
+    # start from inclusion-exclusion
+    zeros, hsum = register_sums(np.stack([M1, M2, np.maximum(M1, M2)]).astype(np.uint8))
+    a, b, u = estimate_cardinalities(zeros, hsum, p)
+    start = np.log([max(u - b, 1.0), max(u - a, 1.0), max(a + b - u, 1.0)])
+
+    def cost(theta):
+        lam_a, lam_b, lam_x = np.exp(np.clip(theta, -20.0, 60.0))
+        return -joint_log_likelihood(counts, lam_a, lam_b, lam_x, m, q)
+
+    lam_a, lam_b, lam_x = np.exp(np.clip(nelder_mead(cost, start), -20.0, 60.0))
+    return float(lam_a), float(lam_b), float(lam_x)
+
+
+def joint_estimate(first, second):
+    """
+    Maximum-likelihood joint estimate of the cardinalities of two sketches
+    with the same precision and hash width.
+
+    :return: A tuple `(only_first, only_second, both)` of estimated cardinalities.
+    """
+    if first.m != second.m or first.hash_bits != second.hash_bits:
+        raise ValueError('Counters precisions should be equal')
+    serialization.check_hash_family(first.hash_family, second.hash_family)
+
+    return joint_estimate_registers(first._registers(), second._registers(), first.p, first.hash_bits)
+
+
+class SketchSet:
+    """
+    Set algebra over a fixed collection of HyperLogLog sketches sharing one
+    precision and hash family.
+
+    The registers of all sketches are stacked once into an n x m matrix, and
+    the registers of the unions computed are kept in an LRU cache, so that a
+    union reused by several queries is only built once.
+    """
+
+    def __init__(self, sketches, cache_size=1024):
+        """
+        Initializes a SketchSet.
+
+        :param sketches: A sequence of HyperLogLog.
+        :param cache_size: Maximum number of union registers kept in the cache.
+        """
+        sketches = list(sketches)
+        if not sketches:
+            raise ValueError('at least one sketch is needed')
+
+        first = sketches[0]
+        for item in sketches[1:]:
+            if item.m != first.m or item.hash_bits != first.hash_bits:
+                raise ValueError('Counters precisions should be equal')
+            serialization.check_hash_family(first.hash_family, item.hash_family)
+
+        self.p = first.p
+        self.m = first.m
+        self.hash_bits = first.hash_bits
+        self.cache_size = cache_size
+
+        self.registers = np.stack([np.asarray(item._registers(), dtype=np.uint8) for item in sketches])
+        self.cards = estimate_cardinalities(*register_sums(self.registers), self.p)
+
+        self._unions = OrderedDict()
+
+    def __len__(self):
+        return len(self.registers)
+
+    def union_registers(self, indices):
+        """
+        Returns the registers of the union of the sketches at `indices`.
+        The array is shared with the cache and should not be modified.
+        """
+        key = frozenset(indices)
+        if not key:
+            raise ValueError('at least one sketch is needed')
+
+        if len(key) == 1:
+            return self.registers[next(iter(key))]
+
+        M = self._unions.get(key)
+        if M is not None:
+            self._unions.move_to_end(key)
+            return M
+
+        # extend the largest cached union contained in `key`, if any
+        best = max((cached for cached in self._unions if cached < key), key=len, default=frozenset())
+        if best:
+            M = np.maximum(self._unions[best], self.registers[sorted(key - best)].max(axis=0))
+        else:
+            M = self.registers[sorted(key)].max(axis=0)
+
+        self._unions[key] = M
+        if len(self._unions) > self.cache_size:
+            self._unions.popitem(last=False)
+
+        return M
+
+    def union_card(self, indices):
+        """
+        Returns the estimated cardinality of the union of the sketches at `indices`.
+        """
+        zeros, hsum = register_sums(self.union_registers(indices))
+        return float(estimate_cardinalities([zeros], [hsum], self.p)[0])
+
+    def intersection_card(self, i, j, method='mle'):
+        """
+        Returns the estimated cardinality of the intersection of sketches `i` and `j`.
+
+        :param method: 'mle' for the maximum-likelihood joint estimator, or
+            'inclusion_exclusion' for |A| + |B| - |A u B|.
+        """
+        if method == 'mle':
+            return joint_estimate_registers(self.registers[i], self.registers[j], self.p, self.hash_bits)[2]
+        if method == 'inclusion_exclusion':
+            return max(self.cards[i] + self.cards[j] - self.union_card((i, j)), 0.0)
+        raise ValueError("unknown method %r" % method)
+
+    def jaccard(self, i, j, method='mle'):
+        """
+        Returns the estimated Jaccard similarity of sketches `i` and `j`.
+        """
+        if method == 'mle':
+            only_i, only_j, both = joint_estimate_registers(self.registers[i], self.registers[j], self.p, self.hash_bits)
+            union = only_i + only_j + both
+        else:
+            both = self.intersection_card(i, j, method)
+            union = self.union_card((i, j))
+
+        return both / union if union > 0 else 0.0
+
+    def union_matrix(self):
+        """
+        Returns the n x n matrix of the estimated cardinalities of all pairwise
+        unions, the diagonal holding the cardinalities of the sketches.
+
+        Each row is computed at once over the register matrix.
+        """
+        n = len(self.registers)
+        result = np.diag(self.cards)
+
+        for i in range(n - 1):
+            M = np.maximum(self.registers[i], self.registers[i + 1:])
+            result[i, i + 1:] = estimate_cardinalities(*register_sums(M), self.p)
+            result[i + 1:, i] = result[i, i + 1:]
+
+        return result
+
+    def overlap_matrix(self, method='inclusion_exclusion'):
+        """
+        Returns the n x n matrix of the estimated cardinalities of all pairwise
+        intersections, the diagonal holding the cardinalities of the sketches.
+
+        :param method: 'inclusion_exclusion' (default) is computed a row at a
+            time from `union_matrix`, 'mle' runs the joint estimator on every pair.
+        """
+        n = len(self.registers)
+
+        if method == 'inclusion_exclusion':
+            result = self.cards[:, None] + self.cards[None, :] - self.union_matrix()
+            np.fill_diagonal(result, self.cards)
+            return np.maximum(result, 0.0)
+
+        if method != 'mle':
+            raise ValueError("unknown method %r" % method)
+
+        result = np.diag(self.cards)
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                result[i, j] = result[j, i] = self.intersection_card(i, j, 'mle')
+
+        return result
+
+    def jaccard_matrix(self, method='inclusion_exclusion'):
+        """
+        Returns the n x n matrix of the estimated pairwise Jaccard similarities.
+        """
+        intersection = self.overlap_matrix(method)
+        union = self.cards[:, None] + self.cards[None, :] - intersection
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(union > 0, intersection / union, 0.0)
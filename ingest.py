@@ -0,0 +1,321 @@
+import os
+import mmap
+import codecs
+import string
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from hll import HyperLogLog, hash_values
+from recordinality import Recordinality
+from randomhash import RandomHashFamily
+
+
+# tokens are separated by ASCII whitespace, which never occurs inside a
+# multi-byte UTF-8 sequence
+WHITESPACE = b' \t\n\r\x0b\x0c'
+WHITESPACE_BYTES = [WHITESPACE[i:i + 1] for i in range(len(WHITESPACE))]
+
+# number of bytes tokenized at once
+CHUNK_SIZE = 1 << 20
+
+
+def next_boundary(f, offset, size):
+    """
+    Returns the first offset at or after `offset` that is not inside a token.
+    """
+    if offset <= 0:
+        return 0
+
+    f.seek(offset - 1)
+    while offset < size:
+        block = f.read(4096)
+        if not block:
+            break
+        for i, byte in enumerate(block):
+            if byte in WHITESPACE:
+                return offset + i
+        offset += len(block)
+
+    return size
+
+
+def split_ranges(path, parts):
+    """
+    Splits the file at `path` into at most `parts` byte ranges of about the same
+    size, each starting and ending between tokens.
+
+    :return: A list of `(start, end)` offsets.
+    """
+    size = os.path.getsize(path)
+
+    with open(path, 'rb') as f:
+        bounds = sorted(set(next_boundary(f, size * i // parts, size) for i in range(parts + 1)))
+
+    if bounds[-1] != size:
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def normalizer(lowercase=False, punctuation=False):
+    """
+    Returns the function applied to decoded text before it is split, or None.
+
+    :param lowercase: Lowercase the text.
+    :param punctuation: Replace ASCII punctuation by spaces, so that it
+        separates tokens and is not part of them.
+    """
+    table = str.maketrans(string.punctuation, ' ' * len(string.punctuation)) if punctuation else None
+
+    if not lowercase and table is None:
+        return None
+
+    def normalize(text):
+        if lowercase:
+            text = text.lower()
+        if table is not None:
+            text = text.translate(table)
+        return text
+
+    return normalize
+
+
+def stream_tokens(path, start=0, end=None, chunk_size=CHUNK_SIZE, lowercase=False, punctuation=False):
+    """
+    Yields the tokens of the byte range `[start, end)` of `path`, as one list of
+    strings per chunk of about `chunk_size` bytes.
+
+    The file is memory-mapped and tokenized chunk by chunk, so memory use does
+    not depend on the size of the file. A chunk is cut after its last
+    whitespace, the token straddling the cut starts the next chunk. `start` and
+    `end` should lie between tokens, see `split_ranges`. A UTF-8 byte order
+    mark at the start of the file is skipped.
+
+    :param lowercase: Lowercase the tokens.
+    :param punctuation: Treat ASCII punctuation as whitespace.
+    """
+    size = os.path.getsize(path)
+    end = size if end is None else min(end, size)
+    if start >= end:
+        return
+
+    normalize = normalizer(lowercase, punctuation)
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if start == 0 and mm[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+            start = len(codecs.BOM_UTF8)
+
+        while start < end:
+            stop = min(start + chunk_size, end)
+
+            if stop < end:
+                # cut after the last whitespace, if the chunk holds one
+                cut = max(mm.rfind(c, start, stop) for c in WHITESPACE_BYTES)
+                if cut < start:
+                    cut = next_boundary(f, stop, end) - 1
+                stop = cut + 1
+
+            text = mm[start:stop].decode('utf-8', errors='replace')
+            if normalize is not None:
+                text = normalize(text)
+
+            tokens = text.split()
+            if tokens:
+                yield tokens
+
+            start = stop
+
+
+def add_file(sketch, path, chunk_size=CHUNK_SIZE, lowercase=False, punctuation=False):
+    """
+    Adds the tokens of the file at `path` to `sketch`, in the calling process,
+    a chunk at a time through its batch API.
+
+    :param sketch: A sketch with `add_hashes` and `hash_family`: HyperLogLog,
+        Recordinality, StochasticRecordinality or ShardedSketch.
+    :return: `sketch`.
+    """
+    for tokens in stream_tokens(path, chunk_size=chunk_size, lowercase=lowercase, punctuation=punctuation):
+        sketch.add_hashes(hash_values(sketch.hash_family, tokens))
+
+    return sketch
+
+
+def stream_frequencies(path, chunk_size=CHUNK_SIZE, separator=':'):
+    """
+    Yields the entries of a frequency file of `key<separator> count` lines, such
+    as the `datasets/*.dat` files, as one `(keys, counts)` pair per chunk of
+    about `chunk_size` bytes: a list of strings and an int64 numpy array.
+
+    The key is everything before the last separator of the line.
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = len(codecs.BOM_UTF8) if mm[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+        while start < size:
+            stop = min(start + chunk_size, size)
+            if stop < size:
+                # cut after the last complete line
+                cut = mm.rfind(b'\n', start, stop)
+                stop = cut + 1 if cut >= start else (mm.find(b'\n', stop) + 1 or size)
+
+            entries = [line.rpartition(separator) for line in mm[start:stop].decode('utf-8').splitlines() if line]
+            start = stop
+
+            for key, found, count in entries:
+                if not found:
+                    raise ValueError('malformed frequency line %r in %s' % (count, path))
+
+            if entries:
+                yield [key for key, _, _ in entries], np.array([int(count) for _, _, count in entries], dtype=np.int64)
+
+
+def add_counts(sketch, keys, counts=None):
+    """
+    Adds pre-aggregated input to `sketch`: distinct `keys` with their number of
+    occurrences `counts`. The sketches ignore duplicates, so each key is only
+    hashed once whatever its count; keys with a zero count are skipped.
+
+    :param sketch: A sketch with `add_hashes` and `hash_family`.
+    :param keys: A sequence of keys.
+    :param counts: A sequence of non-negative counts, or None for one occurrence of each key.
+    :return: A pair `(total, distinct)`: the number of occurrences and of keys
+        added, the exact cardinality if the keys are distinct.
+    """
+    if counts is None:
+        counts = np.ones(len(keys), dtype=np.int64)
+    else:
+        counts = np.asarray(counts, dtype=np.int64)
+        if len(counts) != len(keys):
+            raise ValueError('keys and counts should have the same length')
+        if (counts < 0).any():
+            raise ValueError('counts should not be negative')
+
+        if not counts.all():
+            keys = [key for key, present in zip(keys, (counts > 0).tolist()) if present]
+            counts = counts[counts > 0]
+
+    if len(keys):
+        sketch.add_hashes(hash_values(sketch.hash_family, keys))
+
+    return int(counts.sum()), len(keys)
+
+
+def add_frequency_file(sketch, path, chunk_size=CHUNK_SIZE, separator=':'):
+    """
+    Adds the keys of a frequency file to `sketch`, see `stream_frequencies`.
+
+    :return: A pair `(total, distinct)`: the number of tokens the file counts
+        and its number of keys, the exact cardinality.
+    """
+    total = distinct = 0
+
+    for keys, counts in stream_frequencies(path, chunk_size, separator):
+        added, found = add_counts(sketch, keys, counts)
+        total += added
+        distinct += found
+
+    return total, distinct
+
+
+def empty_like(sketch):
+    """
+    Returns an empty sketch with the parameters and hash family of `sketch`.
+    """
+    if isinstance(sketch, HyperLogLog):
+        return HyperLogLog(p=sketch.p, hash_family=sketch.hash_family, packed=sketch.packed, sparse=sketch.sparse)
+    return Recordinality(sketch.k, hash_family=sketch.hash_family, estimator=sketch.estimator)
+
+
+def _ingest_range(task):
+    """
+    Worker function: sketches the tokens of one byte range into the empty
+    sketch `sketch`, and returns it serialized.
+    """
+    sketch, path, start, end, chunk_size, lowercase, punctuation = task
+
+    for tokens in stream_tokens(path, start, end, chunk_size, lowercase, punctuation):
+        sketch.add_hashes(hash_values(sketch.hash_family, tokens))
+
+    return sketch.to_bytes()
+
+
+def ingest(path, sketch, workers=None, parts=None, chunk_size=CHUNK_SIZE, lowercase=False, punctuation=False):
+    """
+    Adds the whitespace-separated tokens of the file at `path` to `sketch`, in
+    a pool of processes.
+
+    The file is split into byte ranges aligned on token boundaries, each
+    worker sketches some of the ranges and only sends back the serialized
+    sketch, which is merged into `sketch`.
+
+    :param sketch: A HyperLogLog or a Recordinality, updated in place. The records
+        estimator of Recordinality cannot be merged, use `add_file` for it.
+    :param workers: Number of processes, defaults to the number of CPUs.
+    :param parts: Number of byte ranges, defaults to 4 per process.
+    :param chunk_size: Number of bytes tokenized at once by a worker.
+    :param lowercase: Lowercase the tokens.
+    :param punctuation: Treat ASCII punctuation as whitespace.
+    :return: `sketch`.
+    """
+    if getattr(sketch, 'estimator', None) == 'records':
+        raise ValueError('the records estimator cannot be merged')
+
+    workers = workers or os.cpu_count() or 1
+    parts = parts or 4 * workers
+
+    cls = type(sketch)
+    tasks = [
+        (empty_like(sketch), path, start, end, chunk_size, lowercase, punctuation)
+        for start, end in split_ranges(path, parts)
+    ]
+
+    if workers == 1:
+        results = map(_ingest_range, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_ingest_range, tasks)
+
+    try:
+        sketch.update(*(cls.from_bytes(data, hash_family=sketch.hash_family) for data in results))
+    finally:
+        if workers != 1:
+            executor.shutdown()
+
+    return sketch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate the number of distinct tokens of a text file.')
+    parser.add_argument('path')
+    parser.add_argument('--algorithm', choices=['hll', 'recordinality'], default='hll')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='HyperLogLog error rate')
+    parser.add_argument('-k', type=int, default=1024, help='Recordinality sample size')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--lowercase', action='store_true', help='lowercase the tokens')
+    parser.add_argument('--punctuation', action='store_true', help='treat punctuation as whitespace')
+    parser.add_argument('--frequencies', action='store_true', help='read a file of "key: count" lines')
+    args = parser.parse_args()
+    options = dict(lowercase=args.lowercase, punctuation=args.punctuation)
+
+    hash_family = RandomHashFamily(count=1)
+    if args.algorithm == 'hll':
+        sketch = HyperLogLog(error_rate=args.error_rate, hash_family=hash_family)
+    else:
+        sketch = Recordinality(args.k, hash_family=hash_family)
+
+    if args.frequencies:
+        total, distinct = add_frequency_file(sketch, args.path)
+    else:
+        ingest(args.path, sketch, args.workers, **options)
+
+    estimate = sketch.card() if args.algorithm == 'hll' else sketch.estimate_cardinality()
+    print(round(estimate))
+
+    if args.frequencies:
+        print('exact: %d tokens, %d distinct' % (total, distinct))
+
+if __name__ == '__main__':
+    main()
@@ -10,21 +10,32 @@ version_info = tuple(int(v) if v.isdigit()
                      else v for v in __version__.split('.'))
 
 
-from .implemented import RandomHashFamily
+from .implemented import RandomHashFamily, RandomHashFamily64, BACKENDS, get_family, from_fingerprint
+from .cache import CachedRandomHashFamily
 
 # to allow for normalizations
 
 from .helpers import int_to_real, real_to_int
 
-# for convenience, create an instantiated version of the class
+# for convenience, an instantiated version of the class, created on first use
 
 _default_hash_function_count = 100
 
-_default_random_hash_family = RandomHashFamily(
-    count=_default_hash_function_count,
-    seed=None,
-    as_real=False, # default is to return integers, because exact
-)
 
-hash = _default_random_hash_family.hash
-hashes = _default_random_hash_family.hashes
\ No newline at end of file
+def __getattr__(name):
+
+    if name not in ("_default_random_hash_family", "hash", "hashes"):
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    global _default_random_hash_family, hash, hashes
+
+    _default_random_hash_family = RandomHashFamily(
+        count=_default_hash_function_count,
+        seed=None,
+        as_real=False, # default is to return integers, because exact
+    )
+
+    hash = _default_random_hash_family.hash
+    hashes = _default_random_hash_family.hashes
+
+    return globals()[name]
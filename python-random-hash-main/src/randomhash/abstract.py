@@ -7,6 +7,9 @@ class AbstractRandomHashFamily:
 
     _WORD_SIZE = helpers.WORD_SIZE
 
+    # name of the base hash, see `implemented.BACKENDS`
+    _BACKEND = None
+
     _count = 1
     _prng = None
     _seed = None
@@ -56,6 +59,12 @@ class AbstractRandomHashFamily:
         except Exception as exc:
             raise ValueError("error with `count`: {}".format(exc))
 
+        # an unseeded family draws its seed, so that it can always be
+        # rebuilt from its fingerprint
+
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+
         self._count = count
         self._seed = seed
         self._as_real = as_real
@@ -68,6 +77,15 @@ class AbstractRandomHashFamily:
 
         self._gen_tbls()
 
+    def fingerprint(self) -> typing.Tuple:
+        """
+        Returns `(backend, seed, word size, count)`. The tables are drawn from
+        the seed, so two families with the same fingerprint compute the same
+        hash values, and a family can be rebuilt from its fingerprint with
+        `implemented.from_fingerprint`.
+        """
+        return (self._BACKEND, self._seed, self._WORD_SIZE, self._count)
+
     def _base_hash(
         self,
         key: str,
@@ -132,3 +150,62 @@ class AbstractRandomHashFamily:
     ) -> int:
         array = self.hashes(key=key, count=1, as_real=as_real)
         return array[0]
+
+    def hashes_batch(
+        self,
+        keys: typing.Sequence[str],
+        count: typing.Optional[int] = None,
+        as_real: typing.Optional[bool] = None,
+    ) -> "numpy.ndarray":
+        """
+        Hashes a sequence of keys at once, returning a NumPy array of shape
+        `(len(keys), count)` whose row `i` is `self.hashes(keys[i], count)`.
+
+        The base hash is computed key by key, the affine transforms and the
+        truncation are applied to the whole batch. Requires NumPy.
+        """
+
+        try:
+            import numpy as np
+        except ImportError:  # pragma: no cover
+            raise ImportError("`hashes_batch` requires NumPy")
+
+        as_real = as_real or self._as_real
+
+        if count is None:
+            count = self._count
+
+        if count > self._count:
+            raise ValueError((
+                "cannot generate more than m={} hash values; "
+                "initialize class with larger count of hash values"
+            ).format(self._count))
+
+        if count < 0:
+            raise ValueError("cannot generate invalid count of hash values")
+
+        # compute the base hashes
+
+        base_key_hashes = np.fromiter(
+            map(self._base_hash, keys),
+            dtype=np.uint64,
+            count=len(keys),
+        )
+
+        # generate the derivate hashes; uint64 arithmetic wraps modulo 2^64,
+        # which preserves the low `_WORD_SIZE` bits kept by the truncation
+
+        mask = (1 << self._WORD_SIZE) - 1
+
+        a = np.array([x & mask for x in self._tbl_coprime[:count]], dtype=np.uint64)
+        b = np.array([x & mask for x in self._tbl_noise[:count]], dtype=np.uint64)
+
+        computed_hashes = (base_key_hashes[:, None] * a + b) & np.uint64(mask)
+
+        if as_real:
+            return computed_hashes / (2.0**self._WORD_SIZE - 1.0)
+
+        if self._WORD_SIZE <= 32:
+            return computed_hashes.astype(np.uint32)
+
+        return computed_hashes
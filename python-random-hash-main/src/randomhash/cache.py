@@ -0,0 +1,129 @@
+import collections
+import threading
+import typing
+
+from . import abstract
+
+
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"]
+)
+
+
+class CachedRandomHashFamily(abstract.AbstractRandomHashFamily):
+    """
+    A random hash family that memoizes the base hash of the most recently
+    used keys of another family, for streams where a few keys repeat a lot.
+
+    It computes the same hash values as the wrapped family (it shares its
+    seed and tables), so it can be passed wherever a family is expected.
+    The cache holds at most `maxsize` keys and evicts with the CLOCK policy,
+    an approximation of LRU where a hit only sets a reference bit. Lookups
+    and insertions hold a lock, so the family can be shared by threads; the
+    wrapped family hashes outside of it.
+    """
+
+    def __init__(
+        self,
+        family: abstract.AbstractRandomHashFamily,
+        maxsize: int = 65536,
+    ):
+
+        try:
+            # implicitly checks `maxsize` is a number
+            assert maxsize > 0
+        except Exception as exc:
+            raise ValueError("error with `maxsize`: {}".format(exc))
+
+        self.wrapped = family
+        self.maxsize = maxsize
+
+        # share the parameters and tables of the wrapped family
+
+        self._WORD_SIZE = family._WORD_SIZE
+        self._BACKEND = family._BACKEND
+        self._count = family._count
+        self._seed = family._seed
+        self._as_real = family._as_real
+        self._prng = family._prng
+        self._tbl_coprime = family._tbl_coprime
+        self._tbl_noise = family._tbl_noise
+
+        self._lock = threading.Lock()
+        self.cache_clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def cache_clear(self) -> typing.NoReturn:
+        """
+        Empties the cache and resets its counters.
+        """
+        with self._lock:
+            self._slots = {}  # key -> slot
+            self._keys = []
+            self._values = []
+            self._referenced = bytearray()
+            self._hand = 0
+
+            self.lookups = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Returns the hit, miss and eviction counts, and the size of the cache.
+        """
+        return CacheInfo(
+            self.lookups - self.misses, self.misses, self.evictions,
+            self.maxsize, len(self._keys),
+        )
+
+    def _base_hash(self, key):
+        with self._lock:
+            self.lookups += 1
+
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._referenced[slot] = 1
+                return self._values[slot]
+
+            self.misses += 1
+
+        value = self.wrapped._base_hash(key)
+
+        with self._lock:
+            # another thread may have inserted the key meanwhile
+            if key not in self._slots:
+                self._insert(key, value)
+
+        return value
+
+    def _insert(self, key, value):
+        if len(self._keys) < self.maxsize:
+            self._slots[key] = len(self._keys)
+            self._keys.append(key)
+            self._values.append(value)
+            self._referenced.append(0)
+            return
+
+        # advance the hand past the recently used keys, clearing their bit
+
+        hand = self._hand
+        while self._referenced[hand]:
+            self._referenced[hand] = 0
+            hand = (hand + 1) % self.maxsize
+
+        del self._slots[self._keys[hand]]
+        self.evictions += 1
+
+        self._slots[key] = hand
+        self._keys[hand] = key
+        self._values[hand] = value
+        self._hand = (hand + 1) % self.maxsize
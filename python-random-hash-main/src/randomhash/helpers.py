@@ -1,4 +1,5 @@
 
+import importlib
 import random
 
 
@@ -40,6 +41,26 @@ def real_to_int(x_real: float) -> int:
     return int(x_real * (2**WORD_SIZE - 1))
 
 
+class LazyModule:
+    """
+    Stands for a module that is only imported when one of its attributes is
+    first used; the module attributes are then copied to the instance, so
+    later lookups cost no more than on the module itself.
+    """
+
+    def __init__(self, name: str):
+        self.__name = name
+
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
 def str_to_bytes(
     key: str
 ) -> bytes:
@@ -1,19 +1,27 @@
 
 
+import typing
 import zlib
-import xxhash
 
 from . import abstract
 from . import helpers
 
+# only imported by the families that use them, see `helpers.lazy_import`
+
+hashlib = helpers.lazy_import("hashlib")
+xxhash = helpers.lazy_import("xxhash")
+
 class CRC32RandomHashFamily(abstract.AbstractRandomHashFamily):
+
+    _BACKEND = "crc32"
     
     @staticmethod
     def crc32_unsigned(key: str) -> int:
         
-        # crc32 in python takes bits, not strings
+        # crc32 in python takes bits, not strings; UTF-8 encodes ASCII
+        # strings to the same bytes as ASCII, so a single encode suffices
         
-        encoded_key = helpers.str_to_bytes(key=key)
+        encoded_key = key.encode("utf-8")
         
         # python 3 (this library is py3 only)'s zlib implementation
         # of CRC32 already returns unsigned numbers
@@ -27,6 +35,8 @@ class CRC32RandomHashFamily(abstract.AbstractRandomHashFamily):
 
 
 class xxhash32RandomHashFamily(abstract.AbstractRandomHashFamily):
+
+    _BACKEND = "xxh32"
     
     @staticmethod
     def xxhash32_unsigned(key: str) -> int:
@@ -37,5 +47,105 @@ class xxhash32RandomHashFamily(abstract.AbstractRandomHashFamily):
         return xxhash32RandomHashFamily.xxhash32_unsigned(key=key)
 
 
+class xxhash64RandomHashFamily(abstract.AbstractRandomHashFamily):
+
+    _BACKEND = "xxh64"
+
+    # the affine transformations are computed on 64-bit words
+
+    _WORD_SIZE = 64
+
+    @staticmethod
+    def xxhash64_unsigned(key: str) -> int:
+        hashed_key = xxhash.xxh64_intdigest(key)
+        return hashed_key
+
+    def _base_hash(self, key):
+        return xxhash64RandomHashFamily.xxhash64_unsigned(key=key)
+
+
+class xxh3_64RandomHashFamily(abstract.AbstractRandomHashFamily):
+
+    _BACKEND = "xxh3_64"
+
+    _WORD_SIZE = 64
+
+    @staticmethod
+    def xxh3_64_unsigned(key: str) -> int:
+        hashed_key = xxhash.xxh3_64_intdigest(key)
+        return hashed_key
+
+    def _base_hash(self, key):
+        return xxh3_64RandomHashFamily.xxh3_64_unsigned(key=key)
+
+
+class blake2bRandomHashFamily(abstract.AbstractRandomHashFamily):
+
+    _BACKEND = "blake2b"
+
+    # BLAKE2b truncated to a 64-bit digest
+
+    _WORD_SIZE = 64
+
+    @staticmethod
+    def blake2b_unsigned(key: str) -> int:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _base_hash(self, key):
+        return blake2bRandomHashFamily.blake2b_unsigned(key=key)
+
+
 # the standard is CRC32, so we'll make that the default
-RandomHashFamily = CRC32RandomHashFamily
\ No newline at end of file
+RandomHashFamily = CRC32RandomHashFamily
+
+# for large cardinalities, where 32-bit hashes start to collide
+RandomHashFamily64 = xxhash64RandomHashFamily
+
+
+# base hash backends, by name
+
+BACKENDS = {
+    "crc32": CRC32RandomHashFamily,
+    "xxh32": xxhash32RandomHashFamily,
+    "xxh64": xxhash64RandomHashFamily,
+    "xxh3_64": xxh3_64RandomHashFamily,
+    "blake2b": blake2bRandomHashFamily,
+}
+
+
+def get_family(
+    name: str,
+    count: int = 1,
+    seed: typing.Optional[int] = None,
+    as_real: bool = False,
+) -> abstract.AbstractRandomHashFamily:
+    """
+    Returns a random hash family using the base hash backend `name`,
+    one of the keys of `BACKENDS`.
+    """
+
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError("unknown hash backend {!r}, expected one of {}".format(
+            name, ", ".join(BACKENDS)))
+
+    return cls(count=count, seed=seed, as_real=as_real)
+
+
+def from_fingerprint(
+    fingerprint: typing.Tuple,
+) -> abstract.AbstractRandomHashFamily:
+    """
+    Rebuilds the family of fingerprint `(backend, seed, word size, count)`,
+    see `AbstractRandomHashFamily.fingerprint`.
+    """
+
+    backend, seed, word_size, count = fingerprint
+    rhf = get_family(backend, count=count, seed=seed)
+
+    if rhf._WORD_SIZE != word_size:
+        raise ValueError("hash word size mismatch")
+
+    return rhf
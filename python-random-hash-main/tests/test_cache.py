@@ -0,0 +1,74 @@
+import pickle
+import threading
+
+import pytest
+
+from randomhash import implemented
+from randomhash.cache import CachedRandomHashFamily
+
+
+_SOME_STRING = "some string"
+_SOME_SEED = 2
+
+
+def test_init_cached_rhf():
+    CachedRandomHashFamily(implemented.RandomHashFamily())
+
+def test_init_cached_rhf_bad_maxsize():
+    with pytest.raises(ValueError):
+        CachedRandomHashFamily(implemented.RandomHashFamily(), maxsize=0)
+
+def test_cached_rhf_same_hashes():
+    for cls in (implemented.CRC32RandomHashFamily, implemented.xxhash64RandomHashFamily):
+        rhf = cls(count=5, seed=_SOME_SEED)
+        cached = CachedRandomHashFamily(rhf, maxsize=2)
+        keys = [_SOME_STRING, "a", "b", _SOME_STRING, "c", "a"]
+        assert [cached.hashes(key) for key in keys] == [rhf.hashes(key) for key in keys]
+        assert cached.hashes_batch(keys).tolist() == rhf.hashes_batch(keys).tolist()
+
+def test_cached_rhf_counters():
+    cached = CachedRandomHashFamily(implemented.RandomHashFamily(seed=_SOME_SEED), maxsize=2)
+    for key in ["a", "a", "b", "a", "c"]:
+        cached.hash(key)
+    info = cached.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (2, 3, 1, 2)
+
+def test_cached_rhf_clock_keeps_referenced_keys():
+    cached = CachedRandomHashFamily(implemented.RandomHashFamily(seed=_SOME_SEED), maxsize=2)
+    for key in ["a", "b", "a", "c"]:
+        cached.hash(key)
+    # "a" was referenced, so "b" was evicted to make room for "c"
+    cached.hash("a")
+    assert cached.cache_info().evictions == 1
+    assert cached.cache_info().hits == 2
+
+def test_cached_rhf_clear():
+    cached = CachedRandomHashFamily(implemented.RandomHashFamily(), maxsize=2)
+    cached.hash(_SOME_STRING)
+    cached.cache_clear()
+    assert cached.cache_info() == (0, 0, 0, 2, 0)
+
+def test_cached_rhf_threads():
+    rhf = implemented.RandomHashFamily(seed=_SOME_SEED)
+    cached = CachedRandomHashFamily(rhf, maxsize=64)
+    keys = [str(i) for i in range(1000)]
+    expected = rhf.hashes_batch(keys).tolist()
+    results = []
+
+    def run():
+        for _ in range(5):
+            results.append(cached.hashes_batch(keys).tolist() == expected)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(results) and len(results) == 20
+    assert all(cached._keys[slot] == key for key, slot in cached._slots.items())
+
+def test_cached_rhf_pickle():
+    cached = CachedRandomHashFamily(implemented.RandomHashFamily(seed=_SOME_SEED), maxsize=2)
+    cached.hash(_SOME_STRING)
+    other = pickle.loads(pickle.dumps(cached))
+    assert other.hashes("a") == cached.hashes("a")
@@ -1,3 +1,4 @@
+import pytest
 
 from randomhash import implemented
 
@@ -11,6 +12,9 @@ def test_init_crc32_rhf():
 def test_init_xxhash32_rhf():
     implemented.xxhash32RandomHashFamily()
 
+def test_init_xxhash64_rhf():
+    implemented.xxhash64RandomHashFamily()
+
 def test_init_default_rhf():
     implemented.RandomHashFamily()
 
@@ -22,6 +26,82 @@ def test_hash_xxhash32_rhf():
     rhf = implemented.xxhash32RandomHashFamily()
     rhf.hash(_SOME_STRING)
 
+def test_hash_xxhash64_rhf():
+    rhf = implemented.xxhash64RandomHashFamily()
+    rhf.hash(_SOME_STRING)
+
+def test_hash_xxhash64_rhf_word_size():
+    rhf = implemented.RandomHashFamily64(count=10)
+    assert all(0 <= h < 2**64 for h in rhf.hashes(_SOME_STRING))
+    assert any(h >= 2**32 for h in rhf.hashes(_SOME_STRING))
+
 def test_hash_default_rhf():
     rhf = implemented.RandomHashFamily()
-    rhf.hash(_SOME_STRING)
\ No newline at end of file
+    rhf.hash(_SOME_STRING)
+
+def test_hashes_batch_matches_hashes():
+    keys = [_SOME_STRING, "", "ünicode", "x" * 100]
+    for cls in (implemented.CRC32RandomHashFamily,
+                implemented.xxhash32RandomHashFamily,
+                implemented.xxhash64RandomHashFamily):
+        rhf = cls(count=5, seed=1)
+        batch = rhf.hashes_batch(keys)
+        assert batch.shape == (len(keys), 5)
+        assert batch.tolist() == [rhf.hashes(key) for key in keys]
+        assert batch.dtype.itemsize * 8 == rhf._WORD_SIZE
+
+def test_hashes_batch_count_and_real():
+    rhf = implemented.RandomHashFamily(count=5, seed=1)
+    assert rhf.hashes_batch([_SOME_STRING], count=2).tolist() == [rhf.hashes(_SOME_STRING, count=2)]
+    assert rhf.hashes_batch([_SOME_STRING], as_real=True).tolist() == [rhf.hashes(_SOME_STRING, as_real=True)]
+    assert rhf.hashes_batch([]).shape == (0, 5)
+
+def test_hashes_batch_bad_count():
+    rhf = implemented.RandomHashFamily(count=2)
+    with pytest.raises(ValueError):
+        rhf.hashes_batch([_SOME_STRING], count=3)
+
+def test_init_xxh3_64_rhf():
+    implemented.xxh3_64RandomHashFamily()
+
+def test_init_blake2b_rhf():
+    implemented.blake2bRandomHashFamily()
+
+def test_get_family_backends():
+    for name, cls in implemented.BACKENDS.items():
+        rhf = implemented.get_family(name, count=3, seed=1)
+        assert type(rhf) is cls
+        assert rhf.hashes(_SOME_STRING) == cls(count=3, seed=1).hashes(_SOME_STRING)
+        assert all(0 <= h < 2**rhf._WORD_SIZE for h in rhf.hashes("ünicode"))
+
+def test_get_family_unknown_backend():
+    with pytest.raises(ValueError):
+        implemented.get_family("md5")
+
+def test_crc32_encoding_unchanged():
+    from randomhash import helpers
+    import zlib
+    for key in [_SOME_STRING, "ünicode", ""]:
+        expected = zlib.crc32(helpers.str_to_bytes(key))
+        assert implemented.CRC32RandomHashFamily.crc32_unsigned(key) == expected
+
+def test_unseeded_rhf_draws_seed():
+    rhf = implemented.RandomHashFamily()
+    assert isinstance(rhf._seed, int)
+    assert implemented.RandomHashFamily(seed=rhf._seed).hashes(_SOME_STRING) == rhf.hashes(_SOME_STRING)
+
+def test_fingerprint():
+    rhf = implemented.get_family("xxh64", count=2, seed=7)
+    assert rhf.fingerprint() == ("xxh64", 7, 64, 2)
+    assert implemented.RandomHashFamily(seed=1).fingerprint() != implemented.RandomHashFamily(seed=2).fingerprint()
+
+def test_from_fingerprint():
+    for name in implemented.BACKENDS:
+        rhf = implemented.get_family(name, count=3)
+        rebuilt = implemented.from_fingerprint(rhf.fingerprint())
+        assert rebuilt.fingerprint() == rhf.fingerprint()
+        assert rebuilt.hashes(_SOME_STRING) == rhf.hashes(_SOME_STRING)
+
+def test_from_fingerprint_bad_word_size():
+    with pytest.raises(ValueError):
+        implemented.from_fingerprint(("crc32", 1, 64, 1))
@@ -4,3 +4,26 @@ from randomhash import __version__
 
 def test_version():
     assert __version__ == "0.6.0"
+
+
+def test_import_is_lazy():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, randomhash; "
+        "assert 'xxhash' not in sys.modules; "
+        "assert '_default_random_hash_family' not in vars(randomhash); "
+        "randomhash.hash('a'); "
+        "assert '_default_random_hash_family' in vars(randomhash); "
+        "randomhash.implemented.xxhash64RandomHashFamily().hash('a'); "
+        "assert 'xxhash' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_default_hash_functions():
+    import randomhash
+
+    assert len(randomhash.hashes("a")) == randomhash._default_hash_function_count
+    assert randomhash.hash("a") == randomhash._default_random_hash_family.hash("a")
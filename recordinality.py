@@ -1,17 +1,61 @@
-import randomhash
 import heapq
+import numpy as np
+import serialization
+from hll import check_hash_bits, hash_chunks, resolve_hash_family
+
+ESTIMATORS = ('kmv', 'records')
+
 
 class Recordinality:
-    def __init__(self, k):
+    def __init__(self, k, hash_family=None, estimator='kmv'):
         """
         Initialize the Recordinality data structure.
 
+        The sample holds the k smallest distinct hash values seen. Two estimators
+        are computed from it:
+            'kmv': from the k-th smallest hash value (k minimum values).
+            'records': from the number of k-records, i.e. the number of times the
+                sample changed (Helmi et al., Recordinality). It does not depend on
+                the hash values, only on their order, but cannot be merged.
+
         Parameters:
             k (int): The fixed size of the sample.
+            hash_family (RandomHashFamily or str): The hash family to use, or the name of a hash
+                backend (see `randomhash.BACKENDS`). If None, defaults to one with a single 32-bit
+                hash function. Use a 64-bit backend for 64-bit hashes.
+            estimator (str): The estimator used by `estimate_cardinality`, 'kmv' or 'records'.
         """
+        if estimator not in ESTIMATORS:
+            raise ValueError("estimator should be one of %s" % ', '.join(ESTIMATORS))
+
         self.k = k
+        self.estimator = estimator
         self.sample = []  # Max-heap to store the k smallest hash values (negated for min-heap behavior)
-        self.hash_family = randomhash.RandomHashFamily(count=1)
+        self.members = set()  # The hash values in the sample
+        self.records = 0  # Number of times the sample changed, kept exact for the records estimator
+        self.hash_family = resolve_hash_family(hash_family)
+        self.hash_space = float(2 ** self.hash_family._WORD_SIZE)  # Size of the hash space
+
+        # Hash values at or above the threshold cannot enter the sample: it is the
+        # largest sampled value once the sample is full, and above any hash before
+        self.threshold = 1 << self.hash_family._WORD_SIZE
+
+    def _set_sample(self, values):
+        """
+        Replace the sample by the k smallest of `values`, distinct hash values.
+
+        Parameters:
+            values (iterable): The hash values.
+        """
+        smallest = heapq.nsmallest(self.k, values)
+
+        # a list sorted by decreasing hash value is a valid (negated) heap
+        self.sample = [-x for x in reversed(smallest)]
+        self.members = set(smallest)
+        if len(smallest) == self.k:
+            self.threshold = smallest[-1]
+        else:
+            self.threshold = 1 << self.hash_family._WORD_SIZE
 
     def _hash(self, value):
         """
@@ -32,22 +76,314 @@ class Recordinality:
         Parameters:
             value (str): The value to add.
         """
-        hash_value = self._hash(value)
+        self._add_hash(self._hash(value))
+
+    def _add_hash(self, hash_value):
+        """
+        Add a precomputed hash value to the sample.
+
+        Parameters:
+            hash_value (int): The hash value.
+        """
+        if hash_value >= self.threshold or hash_value in self.members:
+            return
+
+        self.records += 1
+        self.members.add(hash_value)
+
         if len(self.sample) < self.k:
             heapq.heappush(self.sample, -hash_value)  # Negate to simulate max-heap
-        elif -hash_value > self.sample[0]:  # If the new hash value is smaller
-            heapq.heapreplace(self.sample, -hash_value)  # Replace the largest
+            if len(self.sample) < self.k:
+                return
+        else:
+            # Replace the largest
+            self.members.discard(-heapq.heapreplace(self.sample, -hash_value))
+
+        self.threshold = -self.sample[0]
+
+    def add_many(self, values, chunk_size=1 << 16):
+        """
+        Add many values to the Recordinality sample.
+
+        Values are hashed chunk by chunk and applied with `add_hashes`.
+
+        Parameters:
+            values (iterable): The values to add.
+            chunk_size (int): Number of values hashed at once.
+        """
+        for hashes in hash_chunks(self.hash_family, values, chunk_size):
+            self.add_hashes(hashes)
+
+    def add_hashes(self, hashes):
+        """
+        Add an array of precomputed hash values to the sample.
+
+        Values at or above the threshold are dropped with one vector comparison.
+        For KMV, the survivors are merged into the sample at once; the records
+        estimator needs their order, so they are added one by one.
+
+        Parameters:
+            hashes (array-like): Unsigned hash values.
+        """
+        x = np.asarray(hashes, dtype=np.uint64)
+        check_hash_bits(x, self.hash_family._WORD_SIZE)
+        if len(self.sample) == self.k:
+            x = x[x < np.uint64(self.threshold)]
+        if x.size == 0:
+            return
+
+        if self.estimator == 'records':
+            for hash_value in x.tolist():
+                self._add_hash(hash_value)
+            return
+
+        # sorted distinct survivors and sampled values, keep the k smallest
+        members = np.fromiter(self.members, dtype=np.uint64, count=len(self.members))
+        self._set_sample(np.union1d(x, members)[:self.k].tolist())
+
+    def update(self, *others):
+        """
+        Merge other Recordinality sketches into this one.
+
+        The merged sample holds the k smallest distinct hash values of all the
+        sketches, so it is the sample a single pass over all the streams gives.
+        The sorted samples are merged lazily, stopping after k distinct values.
+
+        Parameters:
+            others (Recordinality): Sketches with the same sample size and hash family.
+        """
+        if self.estimator == 'records':
+            raise ValueError('the records estimator cannot be merged')
+
+        for other in others:
+            if other.k != self.k:
+                raise ValueError('Sample sizes should be equal')
+            serialization.check_hash_family(self.hash_family, other.hash_family)
+
+        samples = [sorted(self.members)] + [sorted(other.members) for other in others]
+
+        values = []
+        for value in heapq.merge(*samples):
+            if not values or value != values[-1]:
+                values.append(value)
+                if len(values) == self.k:
+                    break
+
+        self._set_sample(values)
+        self.records = len(values)
 
     def estimate_cardinality(self):
         """
-        Estimate the cardinality of the data stream.
+        Estimate the cardinality of the data stream, with the estimator chosen
+        at construction.
+
+        Returns:
+            float: The estimated cardinality.
+        """
+        if self.estimator == 'records':
+            return self.estimate_records()
+        return self.estimate_kmv()
+
+    def estimate_kmv(self):
+        """
+        Estimate the cardinality from the k-th smallest hash value.
 
         Returns:
             float: The estimated cardinality.
         """
         if len(self.sample) < self.k:
-            return 0  # Not enough data to estimate
+            return float(len(self.sample))  # Fewer than k distinct values, counted exactly
         R_k = -self.sample[0]  # Largest hash value in the sample
-        return self.k / (R_k / (2 ** 32))  # Scale based on 32-bit hash space
+        return self.k / (R_k / self.hash_space)  # Scale based on the hash space
+
+    def estimate_records(self):
+        """
+        Estimate the cardinality from the number of k-records.
+
+        Returns:
+            float: The estimated cardinality.
+        """
+        if len(self.sample) < self.k:
+            return float(len(self.sample))  # Fewer than k distinct values, counted exactly
+        return self.k * (1.0 + 1.0 / self.k) ** (self.records - self.k + 1) - 1.0
+
+    def to_bytes(self):
+        """
+        Serialize the sketch, see `serialization` for the format.
+
+        Returns:
+            bytes: The header followed by the sampled hash values, ascending, and
+                for the records estimator the number of records.
+        """
+        sample = np.array(sorted(self.members), dtype='<u8')
+        encoding = serialization.SAMPLE
+        if self.estimator == 'records':
+            encoding = serialization.RECORDS
+            sample = np.append(sample, np.array(self.records, dtype='<u8'))
 
+        header = serialization.pack_header(
+            serialization.RECORDINALITY, encoding, self.k, self.hash_family, len(sample))
+        return header + sample.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, hash_family=None):
+        """
+        Deserialize a sketch produced by `to_bytes`.
+
+        Parameters:
+            data (bytes): The serialized sketch.
+            hash_family (RandomHashFamily or str): The hash family to use, or the name of its
+                backend. If None, it is rebuilt from the family id and seed recorded in `data`.
+
+        Returns:
+            Recordinality: The deserialized sketch.
+        """
+        encoding, k, family_id, word_size, seed, count, length, body = \
+            serialization.unpack_header(data, serialization.RECORDINALITY)
+
+        if encoding not in (serialization.SAMPLE, serialization.RECORDS):
+            raise ValueError('unknown Recordinality encoding %d' % encoding)
+
+        hash_family = serialization.header_family(hash_family, family_id, word_size, seed, count)
+
+        values = np.frombuffer(body, dtype='<u8', count=length).tolist()
+
+        if encoding == serialization.RECORDS:
+            sketch = cls(k, hash_family=hash_family, estimator='records')
+            sketch.records = values.pop()
+        else:
+            sketch = cls(k, hash_family=hash_family)
+            sketch.records = len(values)
+
+        sketch._set_sample(values)
+        return sketch
+
+
+def merge(sketches):
+    """
+    Merge Recordinality sketches into a new one, see `Recordinality.update`.
+
+    Parameters:
+        sketches (list): Sketches with the same sample size and hash family.
+
+    Returns:
+        Recordinality: The merged sketch.
+    """
+    if not sketches:
+        raise ValueError('at least one sketch is needed')
+
+    result = Recordinality(sketches[0].k, hash_family=sketches[0].hash_family)
+    result.update(*sketches)
+    return result
+
+
+class StochasticRecordinality:
+    def __init__(self, k, m, hash_family=None, estimator='kmv'):
+        """
+        Initialize a stochastically averaged Recordinality.
+
+        The low bits of the single hash of an item choose one of `m` buckets,
+        each bucket being a Recordinality of sample size `k`. The cardinality is
+        the sum of the bucket estimates, with about the accuracy of `m`
+        independent sketches for the cost of one hash per item.
+
+        Parameters:
+            k (int): The sample size of each bucket.
+            m (int): The number of buckets, a power of 2.
+            hash_family (RandomHashFamily or str): The hash family to use, shared by all buckets,
+                or the name of a hash backend. If None, defaults to one with a single 32-bit hash function.
+            estimator (str): The estimator of the buckets, 'kmv' or 'records'.
+        """
+        if m < 1 or m & (m - 1):
+            raise ValueError('the number of buckets should be a power of 2')
+        if k < 2:
+            raise ValueError('the sample size of the buckets should be at least 2')
+
+        self.k = k
+        self.m = m
+        self.estimator = estimator
+        self.hash_family = resolve_hash_family(hash_family)
+        self.buckets = [Recordinality(k, hash_family=self.hash_family, estimator=estimator) for _ in range(m)]
+
+    def add(self, value):
+        """
+        Add a value to the sketch.
+
+        Parameters:
+            value (str): The value to add.
+        """
+        hash_value = self.hash_family.hashes(value)[0]
+        self.buckets[hash_value & (self.m - 1)]._add_hash(hash_value)
+
+    def add_many(self, values, chunk_size=1 << 16):
+        """
+        Add many values to the sketch, hashed chunk by chunk.
+
+        Parameters:
+            values (iterable): The values to add.
+            chunk_size (int): Number of values hashed at once.
+        """
+        for hashes in hash_chunks(self.hash_family, values, chunk_size):
+            self.add_hashes(hashes)
+
+    def add_hashes(self, hashes):
+        """
+        Add an array of precomputed hash values to the sketch.
+
+        Values at or above the threshold of their bucket are dropped with one
+        vector comparison, the survivors are split by bucket keeping their order.
+
+        Parameters:
+            hashes (array-like): Unsigned hash values.
+        """
+        x = np.asarray(hashes, dtype=np.uint64)
+        check_hash_bits(x, self.hash_family._WORD_SIZE)
+        bucket = (x & np.uint64(self.m - 1)).astype(np.intp)
+
+        full = np.array([len(b.sample) == b.k for b in self.buckets])
+        thresholds = np.array([b.threshold if len(b.sample) == b.k else 0 for b in self.buckets], dtype=np.uint64)
+
+        keep = ~full[bucket] | (x < thresholds[bucket])
+        x, bucket = x[keep], bucket[keep]
+        if x.size == 0:
+            return
+
+        order = np.argsort(bucket, kind='stable')
+        x, bucket = x[order], bucket[order]
+        bounds = np.searchsorted(bucket, np.arange(self.m + 1))
+
+        for i in np.nonzero(np.diff(bounds))[0]:
+            self.buckets[i].add_hashes(x[bounds[i]:bounds[i + 1]])
+
+    def update(self, *others):
+        """
+        Merge other StochasticRecordinality sketches into this one, bucket by bucket.
+
+        Parameters:
+            others (StochasticRecordinality): Sketches with the same `k`, `m` and hash family.
+        """
+        for other in others:
+            if other.m != self.m:
+                raise ValueError('Numbers of buckets should be equal')
+
+        for i, bucket in enumerate(self.buckets):
+            bucket.update(*(other.buckets[i] for other in others))
+
+    def estimate_cardinality(self):
+        """
+        Estimate the cardinality of the data stream.
+
+        Returns:
+            float: The estimated cardinality, the sum of the bucket estimates.
+        """
+        if self.estimator == 'records':
+            return float(sum(bucket.estimate_records() for bucket in self.buckets))
 
+        # with small samples the k / R_k bias matters, use the unbiased (k - 1) / R_k
+        total = 0.0
+        for bucket in self.buckets:
+            if len(bucket.sample) < self.k:
+                total += len(bucket.sample)
+            else:
+                total += (self.k - 1) / (-bucket.sample[0] / bucket.hash_space)
+        return total
@@ -0,0 +1,183 @@
+import struct
+from randomhash import implemented
+
+
+# Binary format shared by the sketches: a fixed header followed by a body
+#
+#   magic (2s), version (B), algorithm (B), encoding (B), hash family id (B),
+#   hash word size (B), flags (B), p or k (I), hash seed (q),
+#   hash function count (I), body length in items (I)
+#
+# all little-endian.
+
+MAGIC = b'SK'
+VERSION = 1
+
+HEADER = struct.Struct('<2sBBBBBBIqII')
+
+# algorithms
+HYPERLOGLOG = 1
+RECORDINALITY = 2
+
+# body encodings
+DENSE = 0  # one uint8 per register
+PACKED = 1  # 6 bits per register
+SPARSE = 2  # uint32 (index << 6) | rank pairs
+SAMPLE = 3  # uint64 hash values, ascending
+RECORDS = 4  # SAMPLE followed by a uint64 record count
+
+# flags
+HAS_SEED = 1
+
+# hash family ids
+HASH_FAMILIES = {
+    1: implemented.CRC32RandomHashFamily,
+    2: implemented.xxhash32RandomHashFamily,
+    3: implemented.xxhash64RandomHashFamily,
+    4: implemented.xxh3_64RandomHashFamily,
+    5: implemented.blake2bRandomHashFamily,
+}
+
+_HASH_FAMILY_IDS = {cls: family_id for family_id, cls in HASH_FAMILIES.items()}
+
+
+def hash_family_fields(hash_family):
+    """
+    Returns the fields identifying `hash_family` in a header, as a tuple
+    `(family_id, word_size, seed, count, flags)`.
+
+    The seed is only recorded if it is an integer that fits on 64 bits.
+    A cached family is identified by the family it wraps.
+    """
+    hash_family = getattr(hash_family, 'wrapped', hash_family)
+    family_id = _HASH_FAMILY_IDS.get(type(hash_family), 0)
+
+    seed = hash_family._seed
+    flags = 0
+    if isinstance(seed, int) and -(1 << 63) <= seed < (1 << 63):
+        flags |= HAS_SEED
+    else:
+        seed = 0
+
+    return family_id, hash_family._WORD_SIZE, seed, hash_family._count, flags
+
+
+def same_hash_family(first, second):
+    """
+    Tells whether two hash families compute the same hash values: either the
+    same object, or families of a known backend with the same fingerprint.
+    """
+    first = getattr(first, 'wrapped', first)
+    second = getattr(second, 'wrapped', second)
+    if first is second:
+        return True
+
+    return first._BACKEND is not None and first.fingerprint() == second.fingerprint()
+
+
+def check_hash_family(hash_family, other):
+    """
+    Raises ValueError unless the hash families `hash_family` and `other`
+    compute the same hash values, see `same_hash_family`.
+    """
+    if not same_hash_family(hash_family, other):
+        raise ValueError('hash families differ: %r and %r' % (
+            getattr(hash_family, 'wrapped', hash_family).fingerprint(),
+            getattr(other, 'wrapped', other).fingerprint()))
+
+
+def check_header_family(hash_family, family_id, word_size, seed, count):
+    """
+    Raises ValueError unless `hash_family` matches the fields recorded in a
+    header. Families recorded without a seed or id cannot be checked.
+    """
+    if seed is None or family_id == 0:
+        return
+
+    family_id_, word_size_, seed_, count_, flags = hash_family_fields(hash_family)
+    if (family_id_, word_size_, seed_, count_) != (family_id, word_size, seed, count) or not flags & HAS_SEED:
+        raise ValueError('hash family does not match the one recorded in the sketch')
+
+
+def pack_header(algorithm, encoding, param, hash_family, length):
+    """
+    Packs the header of a serialized sketch.
+
+    :param algorithm: HYPERLOGLOG or RECORDINALITY.
+    :param encoding: Encoding of the body (DENSE, PACKED, SPARSE, SAMPLE or RECORDS).
+    :param param: Precision `p` or sample size `k`.
+    :param hash_family: The hash family of the sketch.
+    :param length: Number of items in the body.
+    :return: The header, as bytes.
+    """
+    family_id, word_size, seed, count, flags = hash_family_fields(hash_family)
+
+    return HEADER.pack(
+        MAGIC, VERSION, algorithm, encoding, family_id,
+        word_size, flags, param, seed, count, length,
+    )
+
+
+def unpack_header(data, algorithm):
+    """
+    Unpacks the header of a serialized sketch.
+
+    :param data: A bytes-like object starting with a header.
+    :param algorithm: The expected algorithm.
+    :return: A tuple `(encoding, param, family_id, word_size, seed, count, length, body)`,
+        where `body` is a memoryview on the rest of `data` and `seed` is None if unknown.
+    """
+    view = memoryview(data).cast('B')
+    if len(view) < HEADER.size:
+        raise ValueError('data too short to hold a sketch header')
+
+    magic, version, found, encoding, family_id, word_size, flags, param, seed, count, length = \
+        HEADER.unpack_from(view)
+
+    if magic != MAGIC:
+        raise ValueError('not a serialized sketch')
+    if version != VERSION:
+        raise ValueError('unsupported sketch format version %d' % version)
+    if found != algorithm:
+        raise ValueError('serialized sketch is of algorithm %d, expected %d' % (found, algorithm))
+
+    if not flags & HAS_SEED:
+        seed = None
+
+    return encoding, param, family_id, word_size, seed, count, length, view[HEADER.size:]
+
+
+def make_hash_family(family_id, word_size, seed, count):
+    """
+    Rebuilds the hash family recorded in a sketch header.
+
+    The tables of a family are drawn from its seed, so a family can only be
+    rebuilt if it was created with an integer seed (unseeded families draw one).
+    """
+    if family_id not in HASH_FAMILIES:
+        raise ValueError('unknown hash family id %d, pass `hash_family`' % family_id)
+    if seed is None:
+        raise ValueError('sketch was built with an unseeded hash family, pass `hash_family`')
+
+    hash_family = HASH_FAMILIES[family_id](count=count, seed=seed)
+
+    if hash_family._WORD_SIZE != word_size:
+        raise ValueError('hash word size mismatch')
+
+    return hash_family
+
+
+def header_family(hash_family, family_id, word_size, seed, count):
+    """
+    Returns the hash family of a sketch from its header fields: `hash_family`
+    checked against them, or the recorded family if None. A backend name is
+    resolved with the recorded seed and function count.
+    """
+    if hash_family is None:
+        return make_hash_family(family_id, word_size, seed, count)
+
+    if isinstance(hash_family, str):
+        hash_family = implemented.get_family(hash_family, count=count, seed=seed)
+
+    check_header_family(hash_family, family_id, word_size, seed, count)
+    return hash_family
@@ -0,0 +1,106 @@
+import threading
+from hll import hash_chunks
+
+
+class ShardedSketch:
+    """
+    A sketch shared by several ingestion threads.
+
+    Every thread adds to its own shard, created on first use with `factory`,
+    so threads never write to the same registers or heap. The shards are
+    merged into a fresh sketch when the counter is queried.
+
+    Each shard has its own lock, only contended by queries: a writer takes
+    it once per batch, after hashing, so hashing runs without it.
+    """
+
+    def __init__(self, factory):
+        """
+        Initializes a ShardedSketch.
+
+        :param factory: A callable returning an empty sketch (HyperLogLog or
+            Recordinality), called once per thread and once per query. All the
+            sketches it returns must share one hash family, and be mergeable:
+            the records estimator of Recordinality is not.
+        """
+        self.factory = factory
+        self.prototype = factory()
+        if getattr(self.prototype, 'estimator', None) == 'records':
+            raise ValueError('the records estimator cannot be merged')
+        self.hash_family = self.prototype.hash_family
+
+        self._local = threading.local()
+        self._shards = []  # (lock, sketch) of every thread
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        """
+        Internal function returning the `(lock, sketch)` shard of the calling thread.
+        """
+        shard = getattr(self._local, 'shard', None)
+
+        if shard is None:
+            sketch = self.factory()
+            if sketch.hash_family is not self.hash_family:
+                raise ValueError('factory should return sketches sharing one hash family')
+
+            shard = (threading.Lock(), sketch)
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+
+        return shard
+
+    def add(self, value):
+        """
+        Adds one item, to the shard of the calling thread.
+        """
+        lock, sketch = self._shard()
+        with lock:
+            sketch.add(value)
+
+    def add_many(self, values, chunk_size=1 << 16):
+        """
+        Adds many items, to the shard of the calling thread.
+
+        Items are hashed chunk by chunk outside of the shard lock.
+
+        :param values: An iterable of items.
+        :param chunk_size: Number of items hashed at once.
+        """
+        for hashes in hash_chunks(self.hash_family, values, chunk_size):
+            self.add_hashes(hashes)
+
+    def add_hashes(self, hashes):
+        """
+        Adds an array of precomputed hash values, to the shard of the calling thread.
+        """
+        lock, sketch = self._shard()
+        with lock:
+            sketch.add_hashes(hashes)
+
+    def merged(self):
+        """
+        Returns a new sketch holding the union of all the shards.
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        result = self.factory()
+        for lock, sketch in shards:
+            with lock:
+                result.update(sketch)
+
+        return result
+
+    def card(self):
+        """
+        Returns the estimated number of distinct items added by all threads.
+        """
+        result = self.merged()
+        if hasattr(result, 'card'):
+            return result.card()
+        return result.estimate_cardinality()
+
+    def __len__(self):
+        return round(self.card())
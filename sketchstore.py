@@ -0,0 +1,391 @@
+import os
+import struct
+import hashlib
+import numpy as np
+import serialization
+from hll import HyperLogLog, resolve_hash_family
+
+
+# File layout of a sketch store
+#
+#   header (STORE_HEADER, padded to DATA_OFFSET bytes)
+#   registers: capacity rows of m uint8 registers
+#   key index: `size` sorted uint64 key hashes, the matching uint32 rows,
+#              then the uint32 byte length of each key and the UTF-8 keys,
+#              both in row order
+#
+# all little-endian.
+
+STORE_MAGIC = b'HLLS'
+STORE_VERSION = 1
+
+STORE_HEADER = struct.Struct('<4sBBBBqIIQQQQ')
+
+# registers start on a page boundary
+DATA_OFFSET = 4096
+
+
+def key_hash(key):
+    """
+    Stable 64-bit hash of a key, used to look keys up in the index.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class _RowView(HyperLogLog):
+    """
+    A HyperLogLog whose registers are a row of a SketchStore.
+
+    The row can also be written through the store or through other views,
+    so the estimate is recomputed from the registers on every call.
+    """
+
+    def card(self):
+        """
+        Returns the estimate of the cardinality, from the current registers.
+        """
+        self._recount()
+        return super().card()
+
+
+class SketchStore:
+    """
+    Many HyperLogLog counters, one per key, stored as an N x m register
+    matrix in a single memory-mapped file.
+
+    Opening a store only maps the file: registers and the key index are
+    paged in when they are touched.
+    """
+
+    def __init__(self, path, error_rate=None, hash_family=None, p=None, capacity=1024):
+        """
+        Opens the store at `path`, or creates it if the file does not exist.
+
+        :param path: Path of the store file.
+        :param error_rate: Error rate of the sketches, when creating the store.
+        :param hash_family: An instance of RandomHashFamily, or the name of a hash backend. When creating the
+            store and if None or a name, defaults to one with a single hash function and a random seed. When
+            opening it and if None, it is rebuilt from the seed recorded in the file, and a name is resolved
+            with that seed.
+        :param p: Precision of the sketches, used instead of `error_rate` if given.
+        :param capacity: Initial number of rows, when creating the store.
+        """
+        self.path = path
+
+        if os.path.exists(path):
+            self._open(hash_family)
+        else:
+            self._create(error_rate, hash_family, p, capacity)
+
+    def _create(self, error_rate, hash_family, p, capacity):
+        """
+        Internal function creating an empty store file.
+        """
+        hash_family = resolve_hash_family(hash_family)
+
+        # let HyperLogLog validate and derive the precision
+        prototype = HyperLogLog(error_rate=error_rate, hash_family=hash_family, p=p)
+
+        self.p = prototype.p
+        self.m = prototype.m
+        self.hash_family = hash_family
+        self.capacity = capacity
+        self.size = 0
+
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._rows = np.empty(0, dtype=np.uint32)
+        self._index_offset = DATA_OFFSET + capacity * self.m
+        self._index_length = 0
+        self._new = {}
+
+        with open(self.path, 'wb') as f:
+            f.truncate(self._index_offset)
+
+        self._map()
+        self.flush()
+
+    def _open(self, hash_family):
+        """
+        Internal function opening an existing store file.
+        """
+        with open(self.path, 'rb') as f:
+            header = f.read(STORE_HEADER.size)
+
+        if len(header) < STORE_HEADER.size:
+            raise ValueError('file too short to hold a sketch store header')
+
+        magic, version, p, family_id, word_size, seed, count, flags, capacity, size, index_offset, index_length = \
+            STORE_HEADER.unpack(header)
+
+        if magic != STORE_MAGIC:
+            raise ValueError('not a sketch store')
+        if version != STORE_VERSION:
+            raise ValueError('unsupported sketch store version %d' % version)
+
+        if not flags & serialization.HAS_SEED:
+            seed = None
+
+        hash_family = serialization.header_family(hash_family, family_id, word_size, seed, count)
+
+        self.p = p
+        self.m = 1 << p
+        self.hash_family = hash_family
+        self.capacity = capacity
+        self.size = size
+
+        self._index_offset = index_offset
+        self._index_length = index_length
+        self._new = {}
+
+        self._map()
+
+        self._hashes = np.frombuffer(self._mmap, dtype='<u8', count=size, offset=index_offset)
+        self._rows = np.frombuffer(self._mmap, dtype='<u4', count=size, offset=index_offset + 8 * size)
+
+    def _map(self):
+        """
+        Internal function mapping the whole file.
+        """
+        self._mmap = np.memmap(self.path, dtype=np.uint8, mode='r+')
+        self.registers = self._mmap[DATA_OFFSET:DATA_OFFSET + self.capacity * self.m].reshape(self.capacity, self.m)
+
+    def _grow(self):
+        """
+        Internal function doubling the number of rows of the store.
+
+        Views handed out before remain valid: they map the same file pages.
+        """
+        index = self._index()
+        self._mmap.flush()
+
+        old_offset, old_length = self._index_offset, self._index_length
+        self.capacity *= 2
+        self._index_offset = DATA_OFFSET + self.capacity * self.m
+        self._index_length = len(index)
+
+        with open(self.path, 'r+b') as f:
+            # write the index after the new rows and point the header to it
+            # before dropping the old one, so that the saved keys survive if
+            # the store is not flushed again
+            f.seek(self._index_offset)
+            f.write(index)
+            f.truncate()
+            f.seek(0)
+            f.write(self._header())
+            f.flush()
+
+            # the old index lies in the new rows, which must be zero-filled
+            f.seek(old_offset)
+            f.write(bytes(old_length))
+
+        self._map()
+
+    def _row(self, key, create=False):
+        """
+        Internal function returning the row of `key`, or None if it is absent
+        and `create` is False.
+        """
+        row = self._new.get(key)
+        if row is not None:
+            return row
+
+        h = np.uint64(key_hash(key))
+        i = int(np.searchsorted(self._hashes, h))
+        if i < len(self._hashes) and self._hashes[i] == h:
+            return int(self._rows[i])
+
+        if not create:
+            return None
+
+        if self.size == self.capacity:
+            self._grow()
+
+        row = self.size
+        self._new[key] = row
+        self.size += 1
+
+        # the row may hold the registers of a key that was never flushed
+        self.registers[row] = 0
+        return row
+
+    def __contains__(self, key):
+        return self._row(key) is not None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        row = self._row(key)
+        if row is None:
+            raise KeyError(key)
+        return self._view(row)
+
+    def _view(self, row):
+        """
+        Internal function returning a HyperLogLog whose registers are a view
+        on row `row` of the mapped matrix.
+        """
+        hll = _RowView(p=self.p, hash_family=self.hash_family)
+        hll.M = self.registers[row]
+        hll._recount()
+        return hll
+
+    def sketch(self, key):
+        """
+        Returns the HyperLogLog of `key`, creating an empty one if needed.
+
+        The sketch is a view on the mapped registers: changes made through it
+        are written to the store, and it sees the changes made through the
+        store or other views of the same key.
+        """
+        return self._view(self._row(key, create=True))
+
+    def _stored_keys(self):
+        """
+        Internal function returning the keys recorded in the file index, in
+        row order. They are only decoded on first use.
+        """
+        keys = getattr(self, '_keys', None)
+
+        if keys is None:
+            keys = []
+            n = len(self._hashes)
+
+            if n:
+                offset = self._index_offset + 12 * n
+                lengths = np.frombuffer(self._mmap, dtype='<u4', count=n, offset=offset)
+                blob = bytes(self._mmap[offset + 4 * n:offset + 4 * n + int(lengths.sum())])
+
+                start = 0
+                for length in lengths.tolist():
+                    keys.append(blob[start:start + length].decode('utf-8'))
+                    start += length
+
+            self._keys = keys
+
+        return keys
+
+    def keys(self):
+        """
+        Returns the keys of the store, in row order.
+        """
+        return self._stored_keys() + sorted(self._new, key=self._new.get)
+
+    def add(self, key, values):
+        """
+        Adds items to the sketch of `key`.
+        """
+        self.sketch(key).add_many(values)
+
+    def add_hashes(self, key, hashes):
+        """
+        Adds precomputed hash values to the sketch of `key`.
+        """
+        self.sketch(key).add_hashes(hashes)
+
+    def _rows_of(self, keys):
+        rows = []
+        for key in keys:
+            row = self._row(key)
+            if row is None:
+                raise KeyError(key)
+            rows.append(row)
+        return rows
+
+    def union(self, keys):
+        """
+        Returns a new HyperLogLog counting the union of the sketches of `keys`.
+        """
+        hll = HyperLogLog(p=self.p, hash_family=self.hash_family)
+        hll.update_registers(self.registers[sorted(self._rows_of(keys))])
+        return hll
+
+    def card(self, *keys):
+        """
+        Returns the estimated number of distinct items over the sketches of `keys`.
+        """
+        return self.union(keys).card()
+
+    def merge(self, target, keys):
+        """
+        Merges the sketches of `keys` into the sketch of `target`, in place.
+        """
+        self.sketch(target).update_registers(self.registers[sorted(self._rows_of(keys))])
+
+    def _index(self):
+        """
+        Internal function folding the new keys into the key index, and
+        returning the index as written to the file.
+        """
+        keys = self.keys()
+
+        if self._new:
+            new_hashes = np.array([key_hash(key) for key in self._new], dtype=np.uint64)
+            new_rows = np.array(list(self._new.values()), dtype=np.uint32)
+
+            hashes = np.concatenate([self._hashes, new_hashes])
+            rows = np.concatenate([self._rows, new_rows])
+            order = np.argsort(hashes, kind='stable')
+
+            if len(np.unique(hashes)) != len(hashes):
+                raise ValueError('key hash collision')
+
+            self._hashes, self._rows = hashes[order], rows[order]
+            self._keys, self._new = keys, {}
+        else:
+            # detach the index from the mapping, which is about to change
+            self._hashes, self._rows = np.array(self._hashes), np.array(self._rows)
+
+        encoded = [key.encode('utf-8') for key in keys]
+        lengths = np.array([len(key) for key in encoded], dtype='<u4')
+
+        return b''.join([
+            self._hashes.astype('<u8').tobytes(),
+            self._rows.astype('<u4').tobytes(),
+            lengths.tobytes(),
+        ] + encoded)
+
+    def _header(self):
+        """
+        Internal function returning the packed header of the store.
+        """
+        family_id, word_size, seed, count, flags = serialization.hash_family_fields(self.hash_family)
+
+        return STORE_HEADER.pack(
+            STORE_MAGIC, STORE_VERSION, self.p, family_id, word_size, seed, count, flags,
+            self.capacity, self.size, self._index_offset, self._index_length,
+        )
+
+    def flush(self):
+        """
+        Writes the header and the key index, and flushes the mapped pages.
+        """
+        if self._new:
+            index = self._index()
+
+            self._mmap.flush()
+            with open(self.path, 'r+b') as f:
+                f.seek(self._index_offset)
+                f.write(index)
+                f.truncate()
+
+            self._index_length = len(index)
+            self._map()
+
+        header = self._header()
+        self._mmap[:len(header)] = np.frombuffer(header, dtype=np.uint8)
+        self._mmap.flush()
+
+    def close(self):
+        """
+        Flushes the store and releases the mapping.
+        """
+        self.flush()
+        del self.registers
+        del self._mmap
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
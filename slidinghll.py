@@ -0,0 +1,226 @@
+import time
+import array
+import itertools
+import numpy as np
+import serialization
+from hll import HyperLogLog, estimate_cardinalities, get_rho, hash_chunks, index_and_rank, POW2_NEG_ARRAY
+
+
+# number of single adds buffered before they are pruned into the entries
+ADD_BUFFER = 1 << 12
+
+
+def prune(pairs, stamps):
+    """
+    Keeps the future possible maxima of `(index << 6) | rank` pairs observed
+    at `stamps`: the entries not followed, in the same register, by one of
+    equal or higher rank at the same time or later.
+
+    :return: The kept pairs, sorted, and their timestamps.
+    """
+    # registers in order, newest entries first, highest rank first at equal times
+    order = np.lexsort((-(pairs & 0x3F).astype(np.int64), -stamps, pairs >> 6))
+    pairs, stamps = pairs[order], stamps[order]
+
+    # the index is in the high bits, so a running maximum of the pairs is the
+    # highest rank seen so far in the register, or a pair of an earlier register
+    keep = np.ones(len(pairs), dtype=bool)
+    keep[1:] = pairs[1:] > np.maximum.accumulate(pairs)[:-1]
+
+    # ranks now grow within each register, so the kept pairs are sorted
+    return pairs[keep], stamps[keep]
+
+
+class SlidingHyperLogLog:
+    """
+    HyperLogLog over a sliding window: counts the distinct items seen in the
+    last `window` time units, for any window chosen at query time.
+
+    Each register keeps its list of future possible maxima: the (timestamp,
+    rank) observations not followed by one of equal or higher rank. The
+    register value over a window is then the rank of the oldest entry within
+    it, so any window is answered from the same structure without re-merging.
+
+    The entries of all registers are stored as a sorted uint32 array of
+    `(index << 6) | rank` pairs, as in a sparse HyperLogLog, with a parallel
+    float64 array of timestamps. Within a register the ranks grow as the
+    timestamps get older, and there are about log2(n / m) entries per
+    register for n distinct items.
+
+    Single adds are buffered and pruned into the entries in batches, on the
+    next batch add, merge or query.
+    """
+
+    def __init__(self, error_rate=None, hash_family=None, p=None):
+        """
+        Initializes a SlidingHyperLogLog.
+
+        :param error_rate: Absolute error / cardinality.
+        :param hash_family: An instance of RandomHashFamily, or the name of a hash backend. If None, defaults
+            to one with a single hash function.
+        :param p: Precision, used instead of `error_rate` if given.
+        """
+        prototype = HyperLogLog(error_rate=error_rate, hash_family=hash_family, p=p)
+
+        self.p = prototype.p
+        self.m = prototype.m
+        self.hash_family = prototype.hash_family
+        self.hash_func = prototype.hash_func
+        self.hash_bits = prototype.hash_bits
+
+        self.pairs = np.empty(0, dtype=np.uint32)
+        self.stamps = np.empty(0, dtype=np.float64)
+        self.last = -np.inf  # latest timestamp seen
+
+        # pairs and timestamps of the buffered single adds
+        self._added_pairs = array.array('I')
+        self._added_stamps = array.array('d')
+
+    @property
+    def nbytes(self):
+        """
+        Number of bytes used by the entries of all registers.
+        """
+        self._flush()
+        return self.pairs.nbytes + self.stamps.nbytes
+
+    def _merge(self, pairs=(), stamps=()):
+        """
+        Internal function pruning arrays of new entries, and the buffered
+        single adds, into the entries.
+        """
+        self.pairs, self.stamps = prune(
+            np.concatenate([self.pairs, np.frombuffer(self._added_pairs, dtype=np.uint32)] + list(pairs)),
+            np.concatenate([self.stamps, np.frombuffer(self._added_stamps, dtype=np.float64)] + list(stamps)))
+
+        self._added_pairs = array.array('I')
+        self._added_stamps = array.array('d')
+
+    def _flush(self):
+        """
+        Internal function pruning the buffered single adds into the entries.
+        """
+        if self._added_pairs:
+            self._merge()
+
+    def add(self, value, timestamp=None):
+        """
+        Adds an item observed at `timestamp` (defaults to `time.time()`).
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        if not isinstance(value, str):
+            value = str(value)
+
+        x = self.hash_func(value)[0]
+        j = x & (self.m - 1)
+        rho = get_rho(x >> self.p, self.hash_bits - self.p)
+
+        self._added_pairs.append((j << 6) | rho)
+        self._added_stamps.append(timestamp)
+        if timestamp > self.last:
+            self.last = timestamp
+
+        if len(self._added_pairs) >= ADD_BUFFER:
+            self._merge()
+
+    def add_many(self, values, timestamps=None, chunk_size=1 << 16):
+        """
+        Adds many items, `values[i]` observed at `timestamps[i]`.
+
+        :param values: An iterable of items.
+        :param timestamps: An iterable of timestamps, or a single timestamp
+            for all items, or None for `time.time()`.
+        :param chunk_size: Number of items hashed at once.
+        """
+        if timestamps is None:
+            timestamps = time.time()
+
+        if not np.isscalar(timestamps):
+            timestamps = iter(timestamps)
+
+        for hashes in hash_chunks(self.hash_family, values, chunk_size):
+            if np.isscalar(timestamps):
+                stamps = timestamps
+            else:
+                stamps = np.fromiter(itertools.islice(timestamps, len(hashes)), dtype=np.float64, count=len(hashes))
+
+            self.add_hashes(hashes, stamps)
+
+    def add_hashes(self, hashes, timestamps):
+        """
+        Adds an array of precomputed hash values, observed at `timestamps`
+        (an array of the same length, or a single timestamp).
+        """
+        x = np.asarray(hashes, dtype=np.uint64)
+        if x.size == 0:
+            return
+
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), x.shape)
+
+        j, rho = index_and_rank(x, self.p, self.hash_bits)
+        self._merge([(j.astype(np.uint32) << 6) | rho.astype(np.uint32)], [timestamps])
+        self.last = max(self.last, float(timestamps.max()))
+
+    def registers(self, window, now=None):
+        """
+        Returns the HyperLogLog registers over the items observed in
+        `(now - window, now]`, as a uint8 numpy array.
+
+        :param window: Length of the window, in timestamp units.
+        :param now: End of the window, defaults to the latest timestamp seen.
+            Only the last time of each rank is kept, so it cannot be earlier.
+        """
+        if now is None:
+            now = self.last
+        elif now < self.last:
+            raise ValueError('window should end after the latest timestamp seen')
+
+        self._flush()
+        recent = self.pairs[self.stamps > now - window]
+
+        # highest observed rank in the window, 0 if none
+        M = np.zeros(self.m, dtype=np.uint8)
+        np.maximum.at(M, (recent >> 6).astype(np.intp), (recent & 0x3F).astype(np.uint8))
+        return M
+
+    def sketch(self, window, now=None):
+        """
+        Returns a HyperLogLog of the items observed in `(now - window, now]`.
+        """
+        hll = HyperLogLog(p=self.p, hash_family=self.hash_family)
+        hll.M = bytearray(self.registers(window, now).tobytes())
+        hll._recount()
+        return hll
+
+    def card(self, window, now=None):
+        """
+        Returns the estimated number of distinct items observed in `(now - window, now]`.
+        """
+        M = self.registers(window, now)
+        zeros = self.m - np.count_nonzero(M)
+        return float(estimate_cardinalities([zeros], [POW2_NEG_ARRAY[M].sum()], self.p)[0])
+
+    def expire(self, before):
+        """
+        Forgets the observations made before `before`.
+        """
+        self._flush()
+        kept = self.stamps >= before
+        self.pairs, self.stamps = self.pairs[kept], self.stamps[kept]
+
+    def update(self, *others):
+        """
+        Merges other SlidingHyperLogLog counters into this one.
+        """
+        for item in others:
+            if self.m != item.m or self.hash_bits != item.hash_bits:
+                raise ValueError('Counters precisions should be equal')
+            serialization.check_hash_family(self.hash_family, item.hash_family)
+
+        for item in others:
+            item._flush()
+
+        self._merge([item.pairs for item in others], [item.stamps for item in others])
+        self.last = max([self.last] + [item.last for item in others])
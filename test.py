@@ -1,8 +1,8 @@
 import os
-import pandas as pd
 import time  # Import the time module
 from hll import HyperLogLog  # Assuming HyperLogLog is in hll.py
 from recordinality import Recordinality  # Assuming Recordinality is implemented elsewhere
+from ingest import stream_tokens
 
 # Define the dataset folder path
 folder_path = 'datasets/'  # Update this to 'dataset/' or specify the correct path if needed
@@ -28,6 +28,7 @@ else:
             comparison_results.append(result)
 
         # Convert the results to a pandas DataFrame
+        import pandas as pd
         df = pd.DataFrame(comparison_results, columns=["Book", "True Cardinality", "HLL Estimate", "HLL Time", "Recordinality Estimate", "Recordinality Time"])
         return df
 
@@ -35,12 +36,10 @@ else:
         """
         Test the comparison of HLL and Recordinality on a single book.
         """
-        # Read the book (text file) content
-        with open(book_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Assuming you have a function `process_text` to extract unique words
-        unique_words = set(content.split())
+        # Stream the book (text file) content, keeping the unique words
+        unique_words = set()
+        for words in stream_tokens(book_path):
+            unique_words.update(words)
 
         true_cardinality = len(unique_words)
 
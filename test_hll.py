@@ -1,6 +1,5 @@
 from hll import HyperLogLog
 import numpy as np
-import matplotlib.pyplot as plt
 import random
 import randomhash
 import math
@@ -41,6 +40,7 @@ def plot_cardinality_estimation(n_values, alpha=1.0, N=1000, error_rate=0.01):
         estimated_cardinality = hll.card()
         estimated_cardinalities.append(estimated_cardinality)
 
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(n_values, estimated_cardinalities, label="Estimated Cardinality", marker="o")
     plt.plot(n_values, n_values, color="r", linestyle="--", label="True Cardinality")
@@ -65,6 +65,7 @@ def plot_cardinality_estimation_N(N_values, n, alpha, error_rate=0.01):
         estimated_cardinality = hll.card()
         estimated_cardinalities.append(estimated_cardinality)
 
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(N_values, estimated_cardinalities, label=f"Estimated Cardinality (alpha={alpha})", marker="o")
     plt.plot(N_values, [n] * len(N_values), color="r", linestyle="--", label="True Cardinality")
@@ -89,6 +90,7 @@ def plot_cardinality_estimation_alpha(alpha_values, N=1000, n=100, error_rate=0.
         estimated_cardinality = hll.card()
         estimated_cardinalities.append(estimated_cardinality)
 
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(alpha_values, estimated_cardinalities, label=f"Estimated Cardinality", marker="o")
     plt.plot(alpha_values, [n] * len(alpha_values), color="r", linestyle="--", label="True Cardinality")
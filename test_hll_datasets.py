@@ -3,23 +3,7 @@ import randomhash
 import math
 import time
 from hll import HyperLogLog
-import pandas as pd
-import tkinter as tk
-from tkinter import ttk
-
-# Load data from a .txt file
-def load_txt_file(filepath):
-    """
-    Loads a .txt file where each line contains one word and returns a list of words.
-    """
-    words = []
-    with open(filepath, 'r', encoding='utf-8') as file:
-        for line in file:
-            word = line.strip()
-            if word:  # Only add non-empty words
-                words.append(word)
-    return words
-
+from ingest import stream_tokens
 
 # Process a book to measure time for distinct words counting
 
@@ -27,9 +11,6 @@ def process_book_with_hll(book_path, error_rate=0.01):
     """
     Estimates cardinality for a given book using the HyperLogLog algorithm.
     """
-    # Load words from the book's .txt file
-    words = load_txt_file(book_path)
-    
     # Create the RandomHashFamily for the HyperLogLog
     hash_family = randomhash.RandomHashFamily(count=1)
     
@@ -39,21 +20,26 @@ def process_book_with_hll(book_path, error_rate=0.01):
     # Start measuring time
     start_time = time.time()
     
-    # Add each word to the HyperLogLog estimator
-    for word in words:
-        hll.add(word)
+    # Stream the words of the book's .txt file to the HyperLogLog estimator in batches,
+    # keeping only the distinct words for the true cardinality
+    total_words = 0
+    distinct_words = set()
+    for words in stream_tokens(book_path):
+        hll.add_many(words)
+        total_words += len(words)
+        distinct_words.update(words)
     
     # Estimate the cardinality (number of unique words)
     estimated_cardinality = hll.card()
     
     # Calculate the true cardinality (the number of unique words in the dataset)
-    true_cardinality = len(set(words))
+    true_cardinality = len(distinct_words)
     
     # Measure the time taken to process
     computation_time = time.time() - start_time
     
     # Return results
-    return len(words), estimated_cardinality, true_cardinality, computation_time
+    return total_words, estimated_cardinality, true_cardinality, computation_time
 
 # Function to process all books in a folder and create a table with cardinality comparison for each
 def generate_cardinality_table(folder_path, error_rate=0.01):
@@ -84,6 +70,7 @@ def generate_cardinality_table(folder_path, error_rate=0.01):
         })
     
     # Create a pandas DataFrame to display the results in a table format
+    import pandas as pd
     df = pd.DataFrame(results)
     
     # Display the table in a new Tkinter window
@@ -94,6 +81,9 @@ def display_table_in_window(df):
     """
     Display a pandas DataFrame in a new Tkinter window using a Treeview widget.
     """
+    import tkinter as tk
+    from tkinter import ttk
+
     # Create the Tkinter window
     root = tk.Tk()
     root.title("Cardinality Estimation Results")
@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 import numpy as np
 from recordinality import Recordinality
 import randomhash
@@ -42,6 +41,7 @@ def test_recordinality_for_multiple_ks(alpha, n, N, k_values):
 def plot_recordinality_estimations(results, true_cardinality):
     ks, estimated_cardinalities = zip(*results)
 
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(ks, estimated_cardinalities, marker='o', label="Estimated Cardinality")
     plt.axhline(y=true_cardinality, color='r', linestyle='--', label="True Cardinality")
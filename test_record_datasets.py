@@ -1,27 +1,22 @@
 import os
 import time
-import pandas as pd
 from recordinality import Recordinality
+from ingest import stream_tokens
 import randomhash
 
-# Function to read the content of a book file
-def read_book(book_path):
-    with open(book_path, 'r', encoding='utf-8') as file:
-        return file.read().split()
-
 # Function to test Recordinality on a book dataset
 def test_recordinality_on_book(book_path, k):
-    # Read book content and create the data stream
-    data_stream = read_book(book_path)
-    
     # True cardinality (unique words in the book)
-    true_cardinality = len(set(data_stream))
+    distinct_words = set()
+    for words in stream_tokens(book_path):
+        distinct_words.update(words)
+    true_cardinality = len(distinct_words)
     
-    # Recordinality estimation
+    # Recordinality estimation, streaming the book in batches
     estimator = Recordinality(k=k)
     start_time = time.time()
-    for item in data_stream:
-        estimator.add(item)
+    for words in stream_tokens(book_path):
+        estimator.add_many(words)
     estimated_cardinality = estimator.estimate_cardinality()
     computation_time = time.time() - start_time
     
@@ -48,6 +43,7 @@ def generate_cardinality_table(folder_path, k):
             })
     
     # Create a DataFrame from the results
+    import pandas as pd
     df = pd.DataFrame(results)
     return df
 
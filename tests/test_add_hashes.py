@@ -0,0 +1,24 @@
+import pytest
+
+from hll import HyperLogLog
+from recordinality import Recordinality
+
+
+def test_hll_add_hashes_overflow():
+    for sketch in (HyperLogLog(p=10), HyperLogLog(p=10, sparse=True)):
+        with pytest.raises(ValueError):
+            sketch.add_hashes([1 << 32])
+        assert sketch.card() == 0
+
+def test_hll_add_hashes_matches_add():
+    sketch = HyperLogLog(p=10, hash_family="xxh64")
+    other = HyperLogLog(p=10, hash_family=sketch.hash_family)
+    values = [str(i) for i in range(5000)]
+    sketch.add_many(values)
+    for value in values:
+        other.add(value)
+    assert sketch.card() == other.card()
+
+def test_recordinality_add_hashes_overflow():
+    with pytest.raises(ValueError):
+        Recordinality(5).add_hashes([1 << 32])
@@ -0,0 +1,29 @@
+import pytest
+
+from hllmap import HyperLogLogMap
+
+
+def test_map_budget_new_shard():
+    hmap = HyperLogLogMap(p=10, memory_budget=2000)
+    with pytest.raises(MemoryError):
+        hmap.add_pairs(["k%d" % i for i in range(10)], list(range(10)))
+    assert len(hmap) == 0
+    assert hmap.cards().tolist() == []
+
+def test_map_budget_sparse_pairs():
+    hmap = HyperLogLogMap(p=10, shard_size=64, memory_budget=300)
+    hmap.add_pairs(["a"], [1])
+    cards = hmap.cards().tolist()
+    with pytest.raises(MemoryError):
+        hmap.add_pairs(["a"] * 20 + ["b"], list(range(21)))
+    assert hmap.keys() == ["a"]
+    assert hmap.cards().tolist() == cards
+
+def test_map_sketch_is_a_copy():
+    hmap = HyperLogLogMap(p=4, shard_size=4)
+    hmap.add_pairs(["a"] * 100, list(range(100)))
+    sketch = hmap.sketch("a")
+    card = sketch.card()
+    hmap.add_pairs(["a"] * 100, list(range(100, 200)))
+    assert sketch.card() == card
+    assert hmap.card("a") == hmap.sketch("a").card()
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from hll import HyperLogLog
+from hllsets import SketchSet
+from randomhash import get_family
+
+
+_SOME_SEED = 2
+
+
+def _sketches(ranges, p=10):
+    hash_family = get_family("xxh64", seed=_SOME_SEED)
+    sketches = []
+    for start, stop in ranges:
+        hll = HyperLogLog(p=p, hash_family=hash_family)
+        hll.add_many(range(start, stop))
+        sketches.append(hll)
+    return sketches
+
+
+def test_union_intersection_jaccard():
+    a, b, c = _sketches([(0, 3000), (2000, 6000), (10000, 11000)])
+
+    union = a.copy()
+    union.update(b)
+    assert a.union_card(b) == union.card()
+    assert abs(a.union_card(b) - 6000) < 0.1 * 6000
+
+    for method in ("mle", "inclusion_exclusion"):
+        assert abs(a.intersection_card(b, method) - 1000) < 0.3 * 1000
+        assert abs(a.jaccard(b, method) - 1 / 6) < 0.05
+        assert a.intersection_card(c, method) < 100
+    assert a.intersection_card(a) == pytest.approx(a.card(), rel=0.05)
+
+    with pytest.raises(ValueError):
+        a.intersection_card(b, "unknown")
+
+def test_sketch_set_matches_sketches():
+    sketches = _sketches([(0, 3000), (2000, 6000), (10000, 11000), (0, 500)])
+    sketch_set = SketchSet(sketches)
+
+    assert sketch_set.union_card([0, 1]) == sketches[0].union_card(sketches[1])
+    assert sketch_set.union_card([0, 1, 2, 3]) == sketches[0].union_card(*sketches[1:])
+    assert sketch_set.intersection_card(0, 1) == pytest.approx(sketches[0].intersection_card(sketches[1]))
+    assert sketch_set.jaccard(0, 1) == pytest.approx(sketches[0].jaccard(sketches[1]))
+
+def test_sketch_set_cache_reuse():
+    sketch_set = SketchSet(_sketches([(i * 100, i * 100 + 1000) for i in range(6)]), cache_size=2)
+
+    pair = sketch_set.union_registers([0, 1])
+    assert sketch_set.union_registers([1, 0]) is pair
+
+    # a superset extends the cached union, and gives the registers of a full fold
+    triple = sketch_set.union_registers([0, 1, 2])
+    assert (triple == sketch_set.registers[[0, 1, 2]].max(axis=0)).all()
+
+    # least recently used unions are evicted
+    sketch_set.union_registers([3, 4])
+    assert len(sketch_set._unions) == 2
+    assert frozenset([0, 1]) not in sketch_set._unions
+
+def test_sketch_set_matrices():
+    sketches = _sketches([(0, 3000), (2000, 6000), (10000, 11000), (0, 500)])
+    sketch_set = SketchSet(sketches)
+    n = len(sketches)
+
+    union = sketch_set.union_matrix()
+    for method in ("inclusion_exclusion", "mle"):
+        overlap = sketch_set.overlap_matrix(method)
+        jaccard = sketch_set.jaccard_matrix(method)
+        for matrix in (union, overlap, jaccard):
+            assert matrix.shape == (n, n)
+            assert np.allclose(matrix, matrix.T)
+        assert np.allclose(np.diag(jaccard), 1.0)
+        assert np.allclose(np.diag(overlap), sketch_set.cards)
+
+    assert np.allclose(np.diag(union), sketch_set.cards)
+    for i in range(n):
+        for j in range(i + 1, n):
+            assert union[i, j] == pytest.approx(sketch_set.union_card([i, j]))
+
+def test_sketch_set_rejects_mismatches():
+    sketches = _sketches([(0, 10)])
+    with pytest.raises(ValueError):
+        SketchSet([])
+    with pytest.raises(ValueError):
+        SketchSet(sketches + [HyperLogLog(p=12, hash_family=sketches[0].hash_family)])
+    with pytest.raises(ValueError):
+        SketchSet(sketches + [HyperLogLog(p=10, hash_family=get_family("xxh64", seed=_SOME_SEED + 1))])
@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+
+from hll import (
+    HyperLogLog,
+    estimate_bias,
+    estimate_bias_array,
+    estimate_cardinalities,
+    get_bias_index,
+    get_packed,
+    get_threshold,
+    merge,
+    pack_registers,
+    packed_size,
+    reduce_registers,
+    register_sums,
+    set_packed,
+    unpack_registers,
+)
+
+
+def _values(n, offset=0):
+    return [str(i) for i in range(offset, offset + n)]
+
+
+def test_packed_matches_dense():
+    dense = HyperLogLog(p=8, hash_family="xxh64")
+    packed = HyperLogLog(p=8, hash_family=dense.hash_family, packed=True)
+    values = _values(3000)
+    dense.add_many(values[:2000])
+    packed.add_many(values[:2000])
+    for value in values[2000:]:
+        dense.add(value)
+        packed.add(value)
+
+    assert len(packed.M) == packed_size(packed.m) == 3 * packed.m // 4
+    assert (packed._registers() == dense._registers()).all()
+    assert packed.card() == dense.card()
+
+def test_pack_unpack():
+    hll = HyperLogLog(p=8, hash_family="xxh64")
+    hll.add_many(_values(1000))
+    registers = hll._registers().copy()
+
+    hll.pack()
+    assert hll.packed and bytes(hll.M) == bytes(pack_registers(registers))
+    assert (hll._registers() == registers).all()
+
+    hll.unpack()
+    assert not hll.packed and bytes(hll.M) == registers.tobytes()
+
+def test_packed_registers_at_every_offset():
+    registers = np.arange(64, dtype=np.uint8)[::-1].copy()
+    buf = pack_registers(registers)
+    assert (unpack_registers(buf, 64) == registers).all()
+
+    # registers j, j + 1, j + 2, j + 3 start at bit offsets 0, 6, 4 and 2
+    for j in range(8):
+        assert get_packed(buf, j) == registers[j]
+        for value in (0, 63, 21, 42):
+            set_packed(buf, j, value)
+            expected = registers.copy()
+            expected[j] = value
+            assert (unpack_registers(buf, 64) == expected).all()
+        set_packed(buf, j, int(registers[j]))
+
+def test_sparse_promotion():
+    for packed in (False, True):
+        dense = HyperLogLog(p=8, hash_family="xxh64", packed=packed)
+        sparse = HyperLogLog(p=8, hash_family=dense.hash_family, packed=packed, sparse=True)
+
+        for value in _values(20):
+            dense.add(value)
+            sparse.add(value)
+        assert sparse.sparse and sparse.M.dtype == np.uint32
+        assert (sparse._registers() == dense._registers()).all()
+        assert sparse.card() == dense.card()
+
+        sparse.add_many(_values(2000, 20))
+        dense.add_many(_values(2000, 20))
+        assert not sparse.sparse and sparse.packed == packed
+        assert bytes(sparse.M) == bytes(dense.M)
+        assert sparse.card() == dense.card()
+
+def test_mixed_sparse_dense_update():
+    first = HyperLogLog(p=8, hash_family="xxh64", sparse=True)
+    second = HyperLogLog(p=8, hash_family=first.hash_family, sparse=True)
+    third = HyperLogLog(p=8, hash_family=first.hash_family)
+    expected = HyperLogLog(p=8, hash_family=first.hash_family)
+
+    first.add_many(_values(10))
+    second.add_many(_values(10, 5))
+    third.add_many(_values(500, 100))
+    expected.add_many(_values(15) + _values(500, 100))
+
+    # sparse with sparse stays sparse
+    merged = first.copy()
+    merged.update(second)
+    assert merged.sparse
+    assert (merged._registers() == np.maximum(first._registers(), second._registers())).all()
+
+    # sparse with dense, and dense with sparse, become dense
+    merged.update(third)
+    assert not merged.sparse and merged.M == expected.M
+
+    third.update(first, second)
+    assert third.M == expected.M and third.card() == expected.card()
+
+def test_estimate_bias_array_matches_scalar():
+    for p in (4, 8, 12, 14):
+        raw, _ = get_bias_index(p)
+        E = np.concatenate([raw, np.linspace(raw[0] / 2, raw[-1] * 1.5, 101), [raw[0], raw[-1]]])
+        expected = [estimate_bias(e, p) for e in E.tolist()]
+        assert np.allclose(estimate_bias_array(E, p), expected)
+
+def test_threshold_switch():
+    p = 8
+    hll = HyperLogLog(p=p, hash_family="xxh64")
+    m = hll.m
+    branches = set()
+
+    for n in range(0, 2000, 50):
+        hll.add_many(_values(50, n))
+        zeros, hsum = register_sums(hll._registers())
+
+        E = hll.alpha * m * m / hsum
+        if E <= 5 * m:
+            E -= estimate_bias(E, p)
+        H = m * math.log(m / zeros) if zeros else None
+        linear = H is not None and H <= get_threshold(p)
+        branches.add(linear)
+
+        assert hll.card() == (H if linear else E)
+        assert math.isclose(estimate_cardinalities([zeros], [hsum], p)[0], hll.card())
+
+    assert branches == {True, False}
+
+def _assert_sums_exact(hll):
+    zeros, hsum = hll._zeros, hll._hsum
+    hll._recount()
+    assert zeros == hll._zeros
+    assert math.isclose(hsum, hll._hsum, rel_tol=1e-12)
+
+def test_incremental_sums():
+    for options in (dict(), dict(packed=True), dict(sparse=True)):
+        hll = HyperLogLog(p=6, hash_family="xxh64", **options)
+        _assert_sums_exact(hll)
+        for value in _values(50):
+            hll.add(value)
+            _assert_sums_exact(hll)
+        for n in range(50, 3000, 300):
+            hll.add_many(_values(300, n))
+            _assert_sums_exact(hll)
+
+        other = HyperLogLog(p=6, hash_family=hll.hash_family, sparse=True)
+        other.add_many(_values(100, 5000))
+        hll.update(other)
+        _assert_sums_exact(hll)
+        hll.update_registers(other._registers())
+        _assert_sums_exact(hll)
+
+def test_merge_workers_match_serial():
+    rng = np.random.default_rng(0)
+    first = HyperLogLog(p=8, hash_family="xxh64")
+    sketches = [first]
+    for i in range(37):
+        hll = HyperLogLog(p=8, hash_family=first.hash_family, sparse=i % 3 == 0, packed=i % 5 == 0)
+        hll.add_hashes(rng.integers(0, 1 << 63, size=int(rng.integers(1, 400)), dtype=np.uint64))
+        sketches.append(hll)
+
+    serial = merge(sketches)
+    for workers in (2, 3, 4, 8):
+        parallel = merge(sketches, workers=workers)
+        assert (parallel._registers() == serial._registers()).all()
+        assert parallel.card() == serial.card()
+
+    stacked = np.stack([hll._registers() for hll in sketches])
+    out = reduce_registers(np.zeros(first.m, dtype=np.uint8), stacked, workers=4)
+    assert (out == serial._registers()).all()
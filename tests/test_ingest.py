@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+from hll import HyperLogLog
+from ingest import (
+    add_counts,
+    add_file,
+    add_frequency_file,
+    ingest,
+    next_boundary,
+    split_ranges,
+    stream_frequencies,
+    stream_tokens,
+)
+from recordinality import Recordinality
+
+
+_WORDS = ["alpha", "beta", "gamma", "délta", "epsilon", "ζeta"]
+
+
+@pytest.fixture
+def text_path(tmp_path):
+    rng = np.random.default_rng(0)
+    words = ["%s%d" % (_WORDS[i % len(_WORDS)], i) for i in rng.integers(0, 3000, 20000)]
+    lines = [" ".join(words[i:i + 13]) for i in range(0, len(words), 13)]
+    path = tmp_path / "book.txt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_next_boundary(tmp_path):
+    path = tmp_path / "tokens.txt"
+    path.write_bytes(b"ab cd\tef")
+    with open(path, "rb") as f:
+        assert next_boundary(f, 0, 8) == 0
+        # a boundary follows a whitespace
+        assert next_boundary(f, 1, 8) == 3
+        assert next_boundary(f, 3, 8) == 3
+        assert next_boundary(f, 4, 8) == 6
+        assert next_boundary(f, 7, 8) == 8
+
+def test_split_ranges(text_path):
+    data = open(text_path, "rb").read()
+    for parts in (1, 2, 7, 64):
+        ranges = split_ranges(text_path, parts)
+        assert len(ranges) <= parts
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+        tokens = [token for start, end in ranges for token in data[start:end].split()]
+        assert tokens == data.split()
+
+def test_ingest_workers_match_add_many(text_path):
+    words = open(text_path, encoding="utf-8").read().split()
+
+    expected = HyperLogLog(p=10, hash_family="xxh64")
+    expected.add_many(words)
+
+    for workers in (1, 2):
+        sketch = HyperLogLog(p=10, hash_family=expected.hash_family)
+        ingest(text_path, sketch, workers=workers, parts=5, chunk_size=1000)
+        assert sketch.M == expected.M
+
+    sketch = Recordinality(64, hash_family=expected.hash_family)
+    ingest(text_path, sketch, workers=2, parts=3)
+    single = Recordinality(64, hash_family=expected.hash_family)
+    single.add_many(words)
+    assert sorted(sketch.members) == sorted(single.members)
+
+def test_ingest_rejects_records(text_path):
+    sketch = Recordinality(64, estimator="records")
+    # rejected before the file is even read
+    with pytest.raises(ValueError):
+        ingest(text_path + ".missing", sketch, workers=2)
+    add_file(sketch, text_path)
+    assert sketch.records >= 64
+
+def test_stream_tokens_small_chunks(text_path):
+    words = open(text_path, encoding="utf-8").read().split()
+    for chunk_size in (1, 7, 100, 1 << 20):
+        chunks = list(stream_tokens(text_path, chunk_size=chunk_size))
+        assert [token for chunk in chunks for token in chunk] == words
+
+def test_stream_tokens_ranges(text_path):
+    words = open(text_path, encoding="utf-8").read().split()
+    ranges = split_ranges(text_path, 6)
+    streamed = [token for start, end in ranges for chunk in stream_tokens(text_path, start, end, 50) for token in chunk]
+    assert streamed == words
+
+def test_stream_tokens_long_token(tmp_path):
+    path = tmp_path / "long.txt"
+    path.write_text("a " + "é" * 100 + " b", encoding="utf-8")
+    assert [t for chunk in stream_tokens(str(path), chunk_size=8) for t in chunk] == ["a", "é" * 100, "b"]
+
+def test_stream_tokens_bom(tmp_path):
+    path = tmp_path / "bom.txt"
+    path.write_bytes(b"\xef\xbb\xbfbook one\n")
+    assert list(stream_tokens(str(path))) == [["book", "one"]]
+    assert list(stream_tokens(str(path), chunk_size=2)) == [["book"], ["one"]]
+
+def test_stream_tokens_normalization(tmp_path):
+    path = tmp_path / "text.txt"
+    path.write_text("Hello, World! it's\tHELLO", encoding="utf-8")
+    tokens = lambda **options: [t for chunk in stream_tokens(str(path), **options) for t in chunk]
+    assert tokens() == ["Hello,", "World!", "it's", "HELLO"]
+    assert tokens(lowercase=True) == ["hello,", "world!", "it's", "hello"]
+    assert tokens(punctuation=True) == ["Hello", "World", "it", "s", "HELLO"]
+    assert tokens(lowercase=True, punctuation=True, chunk_size=3) == ["hello", "world", "it", "s", "hello"]
+
+def test_add_file_matches_add_many(text_path):
+    words = open(text_path, encoding="utf-8").read().split()
+    expected = HyperLogLog(p=10, hash_family="xxh64")
+    expected.add_many(words)
+    sketch = add_file(HyperLogLog(p=10, hash_family=expected.hash_family), text_path, chunk_size=333)
+    assert sketch.M == expected.M
+
+def test_stream_frequencies(tmp_path):
+    path = tmp_path / "words.dat"
+    path.write_bytes("\ufeffbook: 3\na:b: 2\n\nzéro: 0\nlast: 10".encode("utf-8"))
+    for chunk_size in (1, 5, 1 << 20):
+        keys, counts = [], []
+        for chunk_keys, chunk_counts in stream_frequencies(str(path), chunk_size):
+            assert chunk_counts.dtype == np.int64
+            keys += chunk_keys
+            counts += chunk_counts.tolist()
+        assert keys == ["book", "a:b", "zéro", "last"]
+        assert counts == [3, 2, 0, 10]
+
+def test_stream_frequencies_malformed(tmp_path):
+    path = tmp_path / "words.dat"
+    path.write_text("book: 3\nbroken\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(stream_frequencies(str(path)))
+
+def test_add_counts():
+    sketch = HyperLogLog(p=10, hash_family="xxh64")
+    assert add_counts(sketch, ["a", "b", "c"], [2, 0, 5]) == (7, 2)
+    assert add_counts(sketch, ["d"]) == (1, 1)
+
+    expected = HyperLogLog(p=10, hash_family=sketch.hash_family)
+    expected.add_many(["a", "c", "d"])
+    assert sketch.M == expected.M
+
+    with pytest.raises(ValueError):
+        add_counts(sketch, ["a", "b"], [1])
+
+def test_add_counts_rejects_negative():
+    sketch = HyperLogLog(p=10, hash_family="xxh64")
+    with pytest.raises(ValueError):
+        add_counts(sketch, ["a", "b"], [3, -1])
+    assert sketch.card() == 0
+
+def test_add_frequency_file_matches_text(tmp_path, text_path):
+    words = open(text_path, encoding="utf-8").read().split()
+    kept = sorted(set(words))[:200]
+    counts = {word: words.count(word) for word in kept}
+    path = tmp_path / "book.dat"
+    path.write_text("".join("%s: %d\n" % item for item in counts.items()), encoding="utf-8")
+
+    sketch = HyperLogLog(p=10, hash_family="xxh64")
+    assert add_frequency_file(sketch, str(path), chunk_size=100) == (sum(counts.values()), len(kept))
+
+    expected = HyperLogLog(p=10, hash_family=sketch.hash_family)
+    expected.add_many(word for word in words if word in counts)
+    assert sketch.M == expected.M
@@ -0,0 +1,156 @@
+import heapq
+
+import numpy as np
+import pytest
+
+from randomhash import get_family
+from recordinality import Recordinality, StochasticRecordinality, merge
+
+
+_SOME_SEED = 2
+
+
+def _streams(n=4, size=3000):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 5000, size).tolist() for _ in range(n)]
+
+
+def test_merge_matches_single_pass():
+    hash_family = get_family("xxh64", seed=_SOME_SEED)
+    streams = _streams()
+
+    single = Recordinality(64, hash_family=hash_family)
+    for stream in streams:
+        single.add_many(stream)
+
+    sketches = []
+    for stream in streams:
+        sketch = Recordinality(64, hash_family=hash_family)
+        sketch.add_many(stream)
+        sketches.append(sketch)
+
+    merged = merge(sketches)
+    assert sorted(merged.members) == sorted(single.members)
+    assert merged.estimate_cardinality() == single.estimate_cardinality()
+
+    sketches[0].update(*sketches[1:])
+    assert sorted(sketches[0].members) == sorted(single.members)
+
+def test_merge_rejects_mismatched_seed():
+    first = Recordinality(16, hash_family=get_family("xxh64", seed=_SOME_SEED))
+    second = Recordinality(16, hash_family=get_family("xxh64", seed=_SOME_SEED + 1))
+    with pytest.raises(ValueError):
+        first.update(second)
+    with pytest.raises(ValueError):
+        merge([first, second])
+    with pytest.raises(ValueError):
+        first.update(Recordinality(32, hash_family=first.hash_family))
+
+def test_merge_rejects_records():
+    hash_family = get_family("xxh64", seed=_SOME_SEED)
+    records = Recordinality(16, hash_family=hash_family, estimator="records")
+    with pytest.raises(ValueError):
+        records.update(Recordinality(16, hash_family=hash_family))
+
+def _brute_force(hashes, k):
+    """
+    Sample and number of k-records of a stream of hash values.
+    """
+    seen, records = set(), 0
+    for h in hashes:
+        if h not in seen:
+            seen.add(h)
+            if h in heapq.nsmallest(k, seen):
+                records += 1
+    return sorted(seen)[:k], records
+
+def test_repeated_key_takes_one_slot():
+    sketch = Recordinality(4, hash_family=get_family("xxh64", seed=_SOME_SEED))
+    for _ in range(10):
+        sketch.add("some string")
+    assert len(sketch.sample) == len(sketch.members) == 1
+    assert sketch.records == 1
+    assert sketch.estimate_cardinality() == 1.0
+
+    for value in ["a", "b", "a", "c", "b", "d", "a"]:
+        sketch.add(value)
+    assert len(sketch.sample) == len(sketch.members) == 4
+    assert sorted(-x for x in sketch.sample) == sorted(sketch.members)
+
+def test_threshold():
+    sketch = Recordinality(3, hash_family=get_family("xxh64", seed=_SOME_SEED))
+    assert sketch.threshold == 1 << 64
+    for h in [50, 40, 30]:
+        sketch._add_hash(h)
+    assert sketch.threshold == 50
+
+    # values at or above the threshold are dropped without changing anything
+    sketch.add_hashes(np.array([50, 60, 1 << 40], dtype=np.uint64))
+    assert sorted(sketch.members) == [30, 40, 50] and sketch.records == 3
+
+    sketch._add_hash(45)
+    assert sorted(sketch.members) == [30, 40, 45] and sketch.threshold == 45
+
+def test_records_estimator():
+    rng = np.random.default_rng(1)
+    hashes = rng.integers(0, 1 << 32, 2000).tolist()
+    hashes += hashes[:500]
+
+    sketch = Recordinality(16, estimator="records")
+    for h in hashes:
+        sketch._add_hash(h)
+    sample, records = _brute_force(hashes, 16)
+    assert sorted(sketch.members) == sample
+    assert sketch.records == records
+    assert sketch.estimate_records() == 16 * (1 + 1 / 16) ** (records - 16 + 1) - 1
+
+    few = Recordinality(16, estimator="records")
+    few.add_many(["a", "b", "a"])
+    assert few.estimate_cardinality() == 2.0
+
+    with pytest.raises(ValueError):
+        Recordinality(16, estimator="unknown")
+
+def test_add_many_matches_add():
+    values = [str(v) for v in _streams(1, 5000)[0]]
+    for estimator in ("kmv", "records"):
+        hash_family = get_family("xxh64", seed=_SOME_SEED)
+        single = Recordinality(32, hash_family=hash_family, estimator=estimator)
+        for value in values:
+            single.add(value)
+
+        batch = Recordinality(32, hash_family=hash_family, estimator=estimator)
+        batch.add_many(values, chunk_size=700)
+
+        assert sorted(batch.members) == sorted(single.members)
+        assert sorted(batch.sample) == sorted(single.sample)
+        assert batch.threshold == single.threshold
+        if estimator == "records":
+            assert batch.records == single.records
+        assert batch.estimate_cardinality() == single.estimate_cardinality()
+
+def test_stochastic_add_many_matches_add():
+    values = [str(v) for v in _streams(1, 5000)[0]]
+    for estimator in ("kmv", "records"):
+        hash_family = get_family("xxh64", seed=_SOME_SEED)
+        single = StochasticRecordinality(16, 8, hash_family=hash_family, estimator=estimator)
+        for value in values:
+            single.add(value)
+
+        batch = StochasticRecordinality(16, 8, hash_family=hash_family, estimator=estimator)
+        batch.add_many(values, chunk_size=700)
+
+        for a, b in zip(batch.buckets, single.buckets):
+            assert sorted(a.members) == sorted(b.members)
+            assert a.threshold == b.threshold
+            if estimator == "records":
+                assert a.records == b.records
+        assert batch.estimate_cardinality() == single.estimate_cardinality()
+
+def test_stochastic_checks_parameters():
+    for m in (0, 3, 12):
+        with pytest.raises(ValueError):
+            StochasticRecordinality(16, m)
+    with pytest.raises(ValueError):
+        StochasticRecordinality(1, 4)
+    StochasticRecordinality(2, 1)
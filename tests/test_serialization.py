@@ -0,0 +1,97 @@
+import pytest
+
+import serialization
+from hll import HyperLogLog
+from randomhash import get_family
+from recordinality import Recordinality
+
+
+_SOME_SEED = 2
+
+
+def _family(name="xxh64", seed=_SOME_SEED):
+    return get_family(name, seed=seed)
+
+
+def _hll(**options):
+    hll = HyperLogLog(p=8, hash_family=_family(), **options)
+    hll.add_many(range(30))
+    return hll
+
+
+def _set_header_field(data, index, value):
+    fields = list(serialization.HEADER.unpack_from(data))
+    fields[index] = value
+    return serialization.HEADER.pack(*fields) + bytes(data[serialization.HEADER.size:])
+
+
+def test_hll_round_trips():
+    for options, encoding in ((dict(), serialization.DENSE),
+                              (dict(packed=True), serialization.PACKED),
+                              (dict(sparse=True), serialization.SPARSE)):
+        hll = _hll(**options)
+        data = hll.to_bytes()
+        assert serialization.HEADER.unpack_from(data)[3] == encoding
+
+        other = HyperLogLog.from_bytes(data)
+        assert (other.packed, other.sparse) == (hll.packed, hll.sparse)
+        assert (other._registers() == hll._registers()).all()
+        assert other.card() == hll.card()
+        assert serialization.same_hash_family(other.hash_family, hll.hash_family)
+
+def test_recordinality_round_trips():
+    for estimator, encoding in (("kmv", serialization.SAMPLE), ("records", serialization.RECORDS)):
+        sketch = Recordinality(8, hash_family=_family(), estimator=estimator)
+        sketch.add_many(range(100))
+        data = sketch.to_bytes()
+        assert serialization.HEADER.unpack_from(data)[3] == encoding
+
+        other = Recordinality.from_bytes(data)
+        assert other.estimator == estimator
+        assert sorted(other.members) == sorted(sketch.members)
+        if estimator == "records":
+            assert other.records == sketch.records
+        assert other.estimate_cardinality() == sketch.estimate_cardinality()
+
+def test_hll_from_bytes_without_copy():
+    hll = _hll()
+    data = bytearray(hll.to_bytes())
+
+    view = HyperLogLog.from_bytes(data, copy=False)
+    view.add_many(range(1000, 2000))
+    assert HyperLogLog.from_bytes(data).card() == view.card()
+
+    frozen = HyperLogLog.from_bytes(bytes(data), copy=False)
+    with pytest.raises((TypeError, ValueError)):
+        frozen.add_many(range(2000, 3000))
+
+    empty = HyperLogLog(p=8, hash_family=_family())
+    frozen = HyperLogLog.from_bytes(empty.to_bytes(), copy=False)
+    with pytest.raises((TypeError, ValueError)):
+        frozen.add("some string")
+
+def test_bad_headers():
+    data = _hll().to_bytes()
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(data[:serialization.HEADER.size - 1])
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(_set_header_field(data, 0, b"XX"))
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(_set_header_field(data, 1, serialization.VERSION + 1))
+    with pytest.raises(ValueError):
+        Recordinality.from_bytes(data)
+
+    sample = Recordinality(8, hash_family=_family()).to_bytes()
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(sample)
+
+def test_mismatched_hash_family():
+    data = _hll().to_bytes()
+    HyperLogLog.from_bytes(data, hash_family=_family())
+    for family in (_family(seed=_SOME_SEED + 1), _family("crc32"), "crc32"):
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(data, hash_family=family)
+
+    sketch = Recordinality(8, hash_family=_family())
+    with pytest.raises(ValueError):
+        Recordinality.from_bytes(sketch.to_bytes(), hash_family=_family(seed=_SOME_SEED + 1))
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from hll import HyperLogLog
+from randomhash import get_family
+from randomhash.cache import CachedRandomHashFamily
+from recordinality import Recordinality, StochasticRecordinality
+from sharded import ShardedSketch
+
+
+_SOME_SEED = 2
+
+
+def _ingest(sharded, chunks):
+    threads = [threading.Thread(target=sharded.add_many, args=(chunk,), kwargs=dict(chunk_size=500)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_sharded_matches_single_sketch():
+    for hash_family in (get_family("xxh64", seed=_SOME_SEED),
+                        CachedRandomHashFamily(get_family("xxh64", seed=_SOME_SEED), maxsize=100)):
+        values = [str(i % 7000) for i in range(20000)]
+        chunks = [values[i::4] for i in range(4)]
+
+        sharded = ShardedSketch(lambda: HyperLogLog(p=10, hash_family=hash_family))
+        _ingest(sharded, chunks)
+        single = HyperLogLog(p=10, hash_family=hash_family)
+        single.add_many(values)
+        assert sharded.merged().M == single.M
+        assert sharded.card() == single.card()
+        assert len(sharded._shards) == 4
+
+        sharded = ShardedSketch(lambda: Recordinality(64, hash_family=hash_family))
+        _ingest(sharded, chunks)
+        single = Recordinality(64, hash_family=hash_family)
+        single.add_many(values)
+        assert sorted(sharded.merged().members) == sorted(single.members)
+        assert sharded.card() == single.estimate_cardinality()
+
+def test_sharded_rejects_bad_factories():
+    with pytest.raises(ValueError):
+        ShardedSketch(lambda: Recordinality(16, estimator="records"))
+    with pytest.raises(ValueError):
+        ShardedSketch(lambda: StochasticRecordinality(16, 4, estimator="records"))
+
+    # every call of the factory builds a new family
+    sharded = ShardedSketch(lambda: HyperLogLog(p=10))
+    with pytest.raises(ValueError):
+        sharded.add("some string")
@@ -0,0 +1,84 @@
+import pytest
+
+from sketchstore import SketchStore
+
+
+_SOME_SEED = 2
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sketches.hlls")
+
+
+def test_store_reopen(path):
+    with SketchStore(path, p=10, hash_family="xxh64") as st:
+        st.add("a", range(500))
+        st.add("b", range(250, 1000))
+        cards = st.card("a"), st.card("b"), st.card("a", "b")
+
+    with SketchStore(path) as st:
+        assert st.keys() == ["a", "b"]
+        assert "a" in st and "c" not in st
+        assert (st.card("a"), st.card("b"), st.card("a", "b")) == cards
+        assert st.hash_family._BACKEND == "xxh64"
+
+def test_store_grow_reopen(path):
+    with SketchStore(path, p=10, capacity=4) as st:
+        st.add("a", range(100))
+        card = st.card("a")
+
+    st = SketchStore(path)
+    for i in range(20):
+        st.sketch("k%d" % i)
+    assert st.capacity == 32
+    assert st.card("a") == card
+
+    # not closed: the keys saved before growing must survive
+    del st
+    with SketchStore(path) as st:
+        assert "a" in st
+        assert st.card("a") == card
+
+def test_store_grow_keeps_new_keys(path):
+    with SketchStore(path, p=10, capacity=2) as st:
+        for i in range(10):
+            st.add("k%d" % i, [i])
+
+    with SketchStore(path) as st:
+        assert st.keys() == ["k%d" % i for i in range(10)]
+        assert all(st.card("k%d" % i) > 0 for i in range(10))
+
+def test_store_unflushed_row_is_cleared(path):
+    with SketchStore(path, p=10) as st:
+        st.sketch("a")
+
+    st = SketchStore(path)
+    st.add("b", range(100))
+    del st
+
+    with SketchStore(path) as st:
+        assert "b" not in st
+        assert st.sketch("c").card() == 0
+
+def test_store_views_are_live(path):
+    with SketchStore(path, p=10) as st:
+        view = st.sketch("a")
+        st.add("a", range(500))
+        assert view.card() == st.card("a") > 0
+
+        other = st.sketch("b")
+        other.add_many(range(1000))
+        st.merge("a", ["b"])
+        assert view.card() == st.card("a", "b")
+
+def test_store_hash_family_name(path):
+    with SketchStore(path, p=10, hash_family="xxh64") as st:
+        st.add("a", range(10))
+        card = st.card("a")
+
+    with SketchStore(path, hash_family="xxh64") as st:
+        assert st.card("a") == card
+
+    with pytest.raises(ValueError):
+        SketchStore(path, hash_family="crc32")
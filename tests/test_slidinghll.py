@@ -0,0 +1,49 @@
+import numpy as np
+
+from hll import HyperLogLog
+from slidinghll import SlidingHyperLogLog
+
+
+def test_sliding_matches_window_sketch():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 5000, 20000).tolist()
+    stamps = np.sort(rng.uniform(0, 1000, 20000))
+
+    sliding = SlidingHyperLogLog(p=8, hash_family="xxh64")
+    sliding.add_many(values[:19000], stamps[:19000], chunk_size=4096)
+    for value, stamp in zip(values[19000:], stamps[19000:]):
+        sliding.add(value, stamp)
+
+    for window in (1, 10, 100, 1000):
+        hll = HyperLogLog(p=8, hash_family=sliding.hash_family)
+        hll.add_many(v for v, t in zip(values, stamps) if t > stamps[-1] - window)
+        assert sliding.sketch(window).M == hll.M
+        assert sliding.card(window) == hll.card()
+
+def test_sliding_keeps_possible_maxima_only():
+    sliding = SlidingHyperLogLog(p=8, hash_family="xxh64")
+    for t in range(100):
+        sliding.add_many(range(1000), t)
+    assert len(sliding.pairs) <= sliding.m
+    assert sliding.stamps.min() == 99
+
+def test_sliding_update_expire():
+    first = SlidingHyperLogLog(p=8, hash_family="xxh64")
+    second = SlidingHyperLogLog(p=8, hash_family=first.hash_family)
+    first.add_many(range(500), 1.0)
+    second.add_many(range(500, 1000), 2.0)
+    first.update(second)
+    assert first.card(10) == first.card(1.5) > 0
+    first.expire(2.0)
+    assert (first.registers(10) == second.registers(10)).all()
+
+def test_sliding_buffered_adds_match_batch():
+    batch = SlidingHyperLogLog(p=6, hash_family="xxh64")
+    single = SlidingHyperLogLog(p=6, hash_family=batch.hash_family)
+    stamps = np.arange(10000) % 977
+    batch.add_many(range(10000), stamps)
+    for value, stamp in zip(range(10000), stamps):
+        single.add(value, stamp)
+    assert (single.registers(100) == batch.registers(100)).all()
+    assert single.pairs.tolist() == batch.pairs.tolist()
+    assert single.stamps.tolist() == batch.stamps.tolist()